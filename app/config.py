@@ -13,16 +13,31 @@ class Config:
     )
     ERPNEXT_API_KEY: str = os.getenv('ERPNEXT_API_KEY', '')
     ERPNEXT_API_SECRET: str = os.getenv('ERPNEXT_API_SECRET', '')
+    # Resolved once at import so per-request checks are a plain attribute load
+    ERPNEXT_CONFIGURED: bool = bool(
+        ERPNEXT_BASE_URL and
+        ERPNEXT_API_KEY and
+        ERPNEXT_API_SECRET and
+        ERPNEXT_BASE_URL != 'https://your-instance.erpnext.com'
+    )
     
     # Application Settings
     DEBUG: bool = os.getenv('DEBUG', 'False').lower() == 'true'
     
+    # Upload Settings
+    MAX_UPLOAD_BYTES: int = int(os.getenv('MAX_UPLOAD_BYTES', str(25 * 1024 * 1024)))
+    # Allowance for multipart boundaries and part headers on top of the file itself
+    UPLOAD_REQUEST_OVERHEAD_BYTES: int = 64 * 1024
+    MAX_CONCURRENT_PARSES: int = int(os.getenv('MAX_CONCURRENT_PARSES', '3'))
+    MAX_BATCH_UPLOAD_FILES: int = int(os.getenv('MAX_BATCH_UPLOAD_FILES', '20'))
+    
+    # Background Sync Settings
+    ERPNEXT_SYNC_WORKERS: int = int(os.getenv('ERPNEXT_SYNC_WORKERS', '4'))
+    
+    # Storage Settings
+    MAX_STORED_INVOICES: int = int(os.getenv('MAX_STORED_INVOICES', '10000'))
+    
     @classmethod
     def validate_erpnext_config(cls) -> bool:
         """Validate that ERPNext configuration is set."""
-        return bool(
-            cls.ERPNEXT_BASE_URL and
-            cls.ERPNEXT_API_KEY and
-            cls.ERPNEXT_API_SECRET and
-            cls.ERPNEXT_BASE_URL != 'https://your-instance.erpnext.com'
-        )
+        return cls.ERPNEXT_CONFIGURED
@@ -17,10 +17,13 @@ class AnomalyController:
         self.anomaly_service = anomaly_service
         self.invoice_controller = invoice_controller
     
-    def analyze_invoice(self, invoice_id: str) -> tuple[Invoice, AnomalyResult]:
+    def analyze_invoice(self, invoice_id: str, force: bool = False) -> tuple[Invoice, AnomalyResult]:
         """
         Analyze an invoice for anomalies.
         
+        Reuses the previous result (e.g. from upload) while the vendor's
+        invoices are unchanged, unless force is True.
+        
         Returns:
             Tuple of (updated_invoice, anomaly_result)
         """
@@ -28,7 +31,7 @@ class AnomalyController:
         invoice = self.invoice_controller.get_invoice(invoice_id)
         
         # Perform analysis
-        anomaly_result = self.anomaly_service.analyze_invoice(invoice)
+        anomaly_result = self.anomaly_service.analyze_invoice(invoice, use_cache=not force)
         
         # Update invoice with analysis results
         updated_invoice = self.invoice_controller.update_invoice_analysis(
@@ -1,8 +1,8 @@
 """Invoice controller - business logic layer."""
 import uuid
 from datetime import datetime
-from typing import List
-from app.models.invoice import Invoice, ParsedInvoice
+from typing import BinaryIO, List, Optional, Union
+from app.models.invoice import Invoice, InvoiceCreate, ParsedInvoice
 from app.services.parser_service import ParserService
 from app.services.storage_service import StorageService
 from app.exceptions import InvoiceNotFoundError
@@ -20,29 +20,37 @@ class InvoiceController:
         self.storage = storage_service
     
     def upload_and_parse_invoice(
-        self, file_content: bytes, filename: str
+        self, file_content: Union[bytes, BinaryIO], filename: str
     ) -> Invoice:
         """Upload and parse an invoice file."""
+        invoice = self.parse_invoice_file(file_content, filename)
+        
+        # Save to storage
+        return self.storage.save(invoice)
+    
+    def parse_invoice_file(
+        self, file_content: Union[bytes, BinaryIO], filename: str
+    ) -> Invoice:
+        """Parse an invoice file into a new invoice without saving it."""
         # Parse the invoice
         parsed_data = self.parser.parse_invoice(file_content, filename)
         
         # Create invoice object
-        invoice = Invoice(
+        return Invoice(
             id=str(uuid.uuid4()),
             parsed_data=parsed_data,
             uploaded_at=datetime.now()
         )
-        
-        # Save to storage
+    
+    def save_invoice(self, invoice: Invoice) -> Invoice:
+        """Save an already parsed invoice."""
         return self.storage.save(invoice)
     
-    def create_invoice_from_data(self, invoice_data: dict) -> Invoice:
-        """Create an invoice from JSON data."""
-        parsed_data = self.parser.parse_invoice_from_json(invoice_data)
-        
+    def create_invoice_from_data(self, invoice_data: InvoiceCreate) -> Invoice:
+        """Create an invoice from request data already validated by FastAPI."""
         invoice = Invoice(
             id=str(uuid.uuid4()),
-            parsed_data=parsed_data,
+            parsed_data=invoice_data,
             uploaded_at=datetime.now()
         )
         
@@ -52,9 +60,15 @@ class InvoiceController:
         """Get an invoice by ID."""
         return self.storage.get(invoice_id)
     
-    def list_invoices(self) -> List[Invoice]:
-        """List all invoices."""
-        return self.storage.get_all()
+    def list_invoices(
+        self, limit: Optional[int] = None, offset: int = 0
+    ) -> List[Invoice]:
+        """List invoices, optionally paginated."""
+        return self.storage.get_all(limit=limit, offset=offset)
+    
+    def count_invoices(self) -> int:
+        """Count all invoices."""
+        return self.storage.count()
     
     def update_invoice_analysis(
         self, invoice_id: str, is_suspicious: bool,
@@ -71,3 +85,7 @@ class InvoiceController:
     def delete_invoice(self, invoice_id: str) -> bool:
         """Delete an invoice by ID."""
         return self.storage.delete(invoice_id)
+    
+    def delete_invoices(self, invoice_ids: List[str]) -> List[str]:
+        """Delete several invoices, returning the IDs that were deleted."""
+        return self.storage.delete_many(invoice_ids)
@@ -1,21 +1,51 @@
 """FastAPI application entry point."""
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+import orjson
+from fastapi import FastAPI, Request, Response, status
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
 from app.views.invoice_views import router as invoice_router
 from app.views.erpnext_views import router as erpnext_router
+from app.services.erpnext_client import close_erpnext_client
+from app.workers import erpnext_sync_pool
+from app.config import Config
+from app.middleware import RequestSizeLimitMiddleware
 from app.exceptions import (
     InvoiceNotFoundError,
-    InvalidInvoiceFormatError,
     ParsingError
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan: release shared resources on shutdown."""
+    yield
+    # Let queued ERPNext syncs finish before their client is closed
+    erpnext_sync_pool.shutdown(wait=True)
+    # Close the pooled ERPNext connections shared by all requests
+    close_erpnext_client()
+
+
 app = FastAPI(
     title="Invoice Parser and AI Anomaly Detection",
     description="API for parsing invoices and detecting anomalies/fraud",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+
+# Reject oversized uploads before the body is read. Added before CORS so
+# CORS stays the outer layer and its headers reach these 413 responses too.
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    limits={
+        "/api/invoices/upload": lambda: Config.MAX_UPLOAD_BYTES + Config.UPLOAD_REQUEST_OVERHEAD_BYTES,
+        "/api/invoices/upload-batch": lambda: Config.MAX_BATCH_UPLOAD_FILES * (
+            Config.MAX_UPLOAD_BYTES + Config.UPLOAD_REQUEST_OVERHEAD_BYTES
+        ),
+    }
 )
 
 # Add CORS middleware
@@ -33,36 +63,23 @@ app.include_router(erpnext_router)
 
 # Mount static files for UI (React app)
 static_dir = Path("static")
+index_path = static_dir / "index.html"
 if static_dir.exists():
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+    app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 
 # Exception handlers
 @app.exception_handler(InvoiceNotFoundError)
 async def invoice_not_found_handler(request, exc):
-    from fastapi.responses import JSONResponse
-    from fastapi import status
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_404_NOT_FOUND,
         content={"detail": str(exc)}
     )
 
 
-@app.exception_handler(InvalidInvoiceFormatError)
-async def invalid_format_handler(request, exc):
-    from fastapi.responses import JSONResponse
-    from fastapi import status
-    return JSONResponse(
-        status_code=status.HTTP_400_BAD_REQUEST,
-        content={"detail": str(exc)}
-    )
-
-
 @app.exception_handler(ParsingError)
 async def parsing_error_handler(request, exc):
-    from fastapi.responses import JSONResponse
-    from fastapi import status
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST,
         content={"detail": str(exc)}
     )
@@ -71,7 +88,6 @@ async def parsing_error_handler(request, exc):
 @app.get("/", response_class=HTMLResponse)
 async def root():
     """Root endpoint - serve React app."""
-    index_path = Path("static/index.html")
     if index_path.exists():
         return FileResponse(index_path)
     # Fallback if React app not built yet
@@ -101,13 +117,16 @@ async def root():
 @app.get("/invoices/{path:path}", response_class=HTMLResponse)
 async def serve_react_app():
     """Serve React app for frontend routes."""
-    index_path = Path("static/index.html")
     if index_path.exists():
         return FileResponse(index_path)
     return HTMLResponse("<h1>Frontend not built</h1><p>Run: cd frontend && npm run build</p>")
 
 
+# The health payload never changes, so encode it once
+HEALTH_RESPONSE_BODY = orjson.dumps({"status": "healthy", "service": "invoice-parser"})
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "invoice-parser"}
+    return Response(content=HEALTH_RESPONSE_BODY, media_type="application/json")
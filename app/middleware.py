@@ -0,0 +1,50 @@
+"""ASGI middleware for the application."""
+from typing import Callable, Dict, Optional
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject oversized request bodies from their Content-Length header.
+    
+    FastAPI reads and spools the whole multipart body before an endpoint runs,
+    so size checks inside the endpoint come too late to save that work. This
+    answers 413 before any of the body is read.
+    """
+    
+    def __init__(self, app: ASGIApp, limits: Dict[str, Callable[[], int]]):
+        """
+        Args:
+            app: The wrapped ASGI application
+            limits: Request path -> callable returning the maximum body size in bytes
+        """
+        self.app = app
+        self.limits = limits
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Answer 413 for oversized POSTs to limited paths, else pass the request on."""
+        if scope["type"] == "http" and scope["method"] == "POST":
+            get_limit = self.limits.get(scope["path"])
+            if get_limit is not None:
+                content_length = self._content_length(scope)
+                limit = get_limit()
+                if content_length is not None and content_length > limit:
+                    response = JSONResponse(
+                        status_code=413,
+                        content={"detail": f"Request body exceeds maximum size of {limit} bytes"}
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+    
+    @staticmethod
+    def _content_length(scope: Scope) -> Optional[int]:
+        """Get the Content-Length header as an int, or None if absent/invalid."""
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
@@ -1,4 +1,4 @@
-from .invoice import Invoice, InvoiceItem, ParsedInvoice
+from .invoice import Invoice, InvoiceItem, ParsedInvoice, InvoiceCreate, BatchUploadResult, BatchUploadError, ERPNextSyncStatus
 from .anomaly import AnomalyResult, AnomalyType
 
-__all__ = ["Invoice", "InvoiceItem", "ParsedInvoice", "AnomalyResult", "AnomalyType"]
+__all__ = ["Invoice", "InvoiceItem", "ParsedInvoice", "InvoiceCreate", "BatchUploadResult", "BatchUploadError", "ERPNextSyncStatus", "AnomalyResult", "AnomalyType"]
@@ -1,7 +1,8 @@
 """Invoice data models."""
 from datetime import datetime
+from enum import Enum
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class InvoiceItem(BaseModel):
@@ -11,8 +12,13 @@ class InvoiceItem(BaseModel):
     unit_price: float
     total_price: float
 
-    def __init__(self, **data):
-        """Initialize with basic validation."""
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize(cls, data):
+        """Apply basic validation, also when the item is parsed from a request body."""
+        if not isinstance(data, dict):
+            return data
+        data = dict(data)
         # No hardcoded item names - generic validation only
         if 'quantity' in data:
             quantity = data['quantity']
@@ -35,7 +41,7 @@ class InvoiceItem(BaseModel):
             except (ValueError, TypeError):
                 pass
         
-        super().__init__(**data)
+        return data
 
     @property
     def calculated_total(self) -> float:
@@ -53,6 +59,30 @@ class ParsedInvoice(BaseModel):
     currency: str = "USD"
 
 
+class InvoiceCreate(ParsedInvoice):
+    """Request body for creating an invoice from JSON data."""
+    items: List[InvoiceItem] = Field(default_factory=list)
+
+    @field_validator("invoice_date", mode="before")
+    @classmethod
+    def _parse_iso_date(cls, value):
+        """Accept any ISO 8601 string, including plain dates like "2024-01-15"."""
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                # Leave it to pydantic to report the invalid value
+                pass
+        return value
+
+
+class ERPNextSyncStatus(str, Enum):
+    """State of an invoice's background sync to ERPNext."""
+    PENDING = "pending"
+    OK = "ok"
+    FAILED = "failed"
+
+
 class Invoice(BaseModel):
     """Complete invoice model with metadata."""
     id: str
@@ -61,3 +91,16 @@ class Invoice(BaseModel):
     is_suspicious: bool = False
     risk_score: Optional[int] = None
     anomaly_explanation: Optional[str] = None
+    erpnext_sync_status: Optional[ERPNextSyncStatus] = None
+
+
+class BatchUploadError(BaseModel):
+    """A file from a batch upload that could not be processed."""
+    filename: str
+    detail: str
+
+
+class BatchUploadResult(BaseModel):
+    """Result of uploading several invoice files at once."""
+    invoices: List[Invoice]
+    errors: List[BatchUploadError]
@@ -1,23 +1,77 @@
 """Anomaly detection service."""
-from typing import List
-from app.models.invoice import Invoice, InvoiceItem
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app.models.invoice import Invoice
 from app.models.anomaly import AnomalyResult, AnomalyDetail, AnomalyType
 from app.services.storage_service import StorageService
+from app.exceptions import InvoiceNotFoundError
+
+
+class ItemHistory(NamedTuple):
+    """Aggregated historical figures for one item name."""
+    avg_price: float
+    avg_quantity: float
+    max_quantity: float
 
 
 class AnomalyService:
     """Service for detecting anomalies in invoices."""
     
+    # Maximum number of analysis results kept in the cache
+    RESULT_CACHE_MAXSIZE = 1024
+    
     def __init__(self, storage_service: StorageService):
         self.storage = storage_service
+        # (invoice_id, vendor_version) -> result, least recently used first
+        self._result_cache: "OrderedDict[Tuple[str, int], AnomalyResult]" = OrderedDict()
+        self._result_cache_lock = threading.Lock()
     
-    def analyze_invoice(self, invoice: Invoice) -> AnomalyResult:
+    def analyze_invoice(self, invoice: Invoice, use_cache: bool = True) -> AnomalyResult:
         """
         Analyze an invoice for anomalies by comparing with historical data.
         
+        Results for stored invoices are cached until any invoice from the
+        same vendor is added, changed or removed.
+        
+        Args:
+            invoice: Invoice to analyze
+            use_cache: If False, recompute and replace any cached result
+        
         Returns:
             AnomalyResult with risk score and explanations
         """
+        cache_key = self._result_cache_key(invoice)
+        if cache_key is not None and use_cache:
+            with self._result_cache_lock:
+                cached = self._result_cache.get(cache_key)
+                if cached is not None:
+                    self._result_cache.move_to_end(cache_key)
+                    return cached
+        
+        result = self._analyze(invoice)
+        
+        if cache_key is not None:
+            with self._result_cache_lock:
+                self._result_cache[cache_key] = result
+                if len(self._result_cache) > self.RESULT_CACHE_MAXSIZE:
+                    self._result_cache.popitem(last=False)
+        return result
+    
+    def _result_cache_key(self, invoice: Invoice) -> Optional[Tuple[str, int]]:
+        """Build the cache key for an invoice, or None if it must not be cached."""
+        try:
+            stored = self.storage.get(invoice.id)
+        except InvoiceNotFoundError:
+            return None
+        # Only cache the stored version of the invoice. Analysis updates copy the
+        # invoice shallowly, so parsed_data identity tracks the parsed content.
+        if stored.parsed_data is not invoice.parsed_data:
+            return None
+        return invoice.id, self.storage.vendor_version(invoice.parsed_data.vendor_name)
+    
+    def _analyze(self, invoice: Invoice) -> AnomalyResult:
+        """Run the anomaly checks for an invoice against its vendor's history."""
         historical_invoices = self.storage.get_by_vendor(
             invoice.parsed_data.vendor_name
         )
@@ -39,22 +93,19 @@ class AnomalyService:
                 explanation="No historical data available for this vendor. First invoice from this vendor."
             )
         
+        # Aggregate historical line items by name once for the item-level checks
+        item_index = self._index_historical_items(historical_invoices)
+        
         # Check for price increases
-        price_anomalies = self._check_price_increases(
-            invoice, historical_invoices
-        )
+        price_anomalies = self._check_price_increases(invoice, item_index)
         anomalies.extend(price_anomalies)
         
         # Check for quantity deviations
-        quantity_anomalies = self._check_quantity_deviations(
-            invoice, historical_invoices
-        )
+        quantity_anomalies = self._check_quantity_deviations(invoice, item_index)
         anomalies.extend(quantity_anomalies)
         
         # Check for new items
-        new_item_anomalies = self._check_new_items(
-            invoice, historical_invoices
-        )
+        new_item_anomalies = self._check_new_items(invoice, item_index)
         anomalies.extend(new_item_anomalies)
         
         # Check for total amount deviation
@@ -77,24 +128,39 @@ class AnomalyService:
             explanation=explanation
         )
     
+    def _index_historical_items(
+        self, historical: List[Invoice]
+    ) -> Dict[str, ItemHistory]:
+        """Aggregate historical line items by item name in a single pass."""
+        # name -> [count, price_sum, quantity_sum, max_quantity]
+        totals: Dict[str, list] = {}
+        for hist_inv in historical:
+            for item in hist_inv.parsed_data.items:
+                entry = totals.get(item.name)
+                if entry is None:
+                    totals[item.name] = [1, item.unit_price, item.quantity, item.quantity]
+                else:
+                    entry[0] += 1
+                    entry[1] += item.unit_price
+                    entry[2] += item.quantity
+                    if item.quantity > entry[3]:
+                        entry[3] = item.quantity
+        return {
+            name: ItemHistory(price_sum / count, quantity_sum / count, max_quantity)
+            for name, (count, price_sum, quantity_sum, max_quantity) in totals.items()
+        }
+    
     def _check_price_increases(
-        self, invoice: Invoice, historical: List[Invoice]
+        self, invoice: Invoice, item_index: Dict[str, ItemHistory]
     ) -> List[AnomalyDetail]:
         """Check for sudden price increases."""
         anomalies = []
         
-        # Build historical price map
-        historical_prices: dict[str, List[float]] = {}
-        for hist_inv in historical:
-            for item in hist_inv.parsed_data.items:
-                if item.name not in historical_prices:
-                    historical_prices[item.name] = []
-                historical_prices[item.name].append(item.unit_price)
-        
         # Check current invoice prices
         for item in invoice.parsed_data.items:
-            if item.name in historical_prices:
-                avg_price = sum(historical_prices[item.name]) / len(historical_prices[item.name])
+            history = item_index.get(item.name)
+            if history is not None:
+                avg_price = history.avg_price
                 price_increase_pct = ((item.unit_price - avg_price) / avg_price) * 100
                 
                 if price_increase_pct > 20:  # More than 20% increase
@@ -110,24 +176,17 @@ class AnomalyService:
         return anomalies
     
     def _check_quantity_deviations(
-        self, invoice: Invoice, historical: List[Invoice]
+        self, invoice: Invoice, item_index: Dict[str, ItemHistory]
     ) -> List[AnomalyDetail]:
         """Check for unreasonable quantity deviations."""
         anomalies = []
         
-        # Build historical quantity map
-        historical_quantities: dict[str, List[float]] = {}
-        for hist_inv in historical:
-            for item in hist_inv.parsed_data.items:
-                if item.name not in historical_quantities:
-                    historical_quantities[item.name] = []
-                historical_quantities[item.name].append(item.quantity)
-        
         # Check current invoice quantities
         for item in invoice.parsed_data.items:
-            if item.name in historical_quantities:
-                avg_quantity = sum(historical_quantities[item.name]) / len(historical_quantities[item.name])
-                max_quantity = max(historical_quantities[item.name])
+            history = item_index.get(item.name)
+            if history is not None:
+                avg_quantity = history.avg_quantity
+                max_quantity = history.max_quantity
                 
                 # Check if quantity is significantly higher than average
                 if item.quantity > avg_quantity * 2:  # More than 2x average
@@ -155,16 +214,13 @@ class AnomalyService:
         return anomalies
     
     def _check_new_items(
-        self, invoice: Invoice, historical: List[Invoice]
+        self, invoice: Invoice, item_index: Dict[str, ItemHistory]
     ) -> List[AnomalyDetail]:
         """Check for new items that never appeared before."""
         anomalies = []
         
         # Build set of all historical item names
-        historical_items = set()
-        for hist_inv in historical:
-            for item in hist_inv.parsed_data.items:
-                historical_items.add(item.name.lower())
+        historical_items = {name.lower() for name in item_index}
         
         # Check for new items
         for item in invoice.parsed_data.items:
@@ -1,19 +1,33 @@
 """ERPNext REST API client service."""
+import json
+import logging
+import threading
+import time
 import requests
-from typing import List, Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Optional, Dict, Any, Set, Tuple
 from datetime import datetime
+from app.config import Config
 from app.models.invoice import ParsedInvoice, InvoiceItem
 from app.exceptions import ParsingError
 
+logger = logging.getLogger(__name__)
+
 
 class ERPNextClient:
     """Client for communicating with ERPNext REST API."""
     
+    # Maximum number of purchase invoices kept in the read cache
+    INVOICE_CACHE_MAXSIZE = 1024
+    
     def __init__(
         self,
         base_url: str,
         api_key: str,
-        api_secret: str
+        api_secret: str,
+        pool_maxsize: int = 20,
+        invoice_cache_ttl: float = 60.0
     ):
         """
         Initialize ERPNext client.
@@ -22,6 +36,8 @@ class ERPNextClient:
             base_url: ERPNext instance URL (e.g., "https://your-instance.erpnext.com")
             api_key: ERPNext API Key
             api_secret: ERPNext API Secret
+            pool_maxsize: Maximum number of pooled keep-alive connections
+            invoice_cache_ttl: Seconds a fetched purchase invoice is served from cache
         """
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
@@ -32,6 +48,28 @@ class ERPNextClient:
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         })
+        # Keep enough warm connections for concurrent requests from worker threads,
+        # and retry idempotent requests (GET/PUT/...) on throttling or gateway errors
+        retries = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503, 504],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retries
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Short-lived cache of fetched purchase invoices: invoice_id -> (expires_at, data)
+        self._invoice_cache_ttl = invoice_cache_ttl
+        self._invoice_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._invoice_cache_lock = threading.Lock()
+    
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self.session.close()
     
     def _get(self, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
         """Make GET request to ERPNext API."""
@@ -92,13 +130,11 @@ class ERPNextClient:
                 error_detail = f"Status: Unknown, Error: {str(e)}"
             
             # Log the full error for debugging
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"ERPNext API Error - URL: {url}")
-            logger.error(f"ERPNext API Error - Status: {status_code}")
-            logger.error(f"ERPNext API Error - Response Text: {response_text[:2000] if response_text else 'No response text'}")
-            logger.error(f"ERPNext API Error - Error Message: {error_message if error_message else 'No error message'}")
-            logger.error(f"ERPNext API Error - Request Data: {str(data)[:500]}")
+            logger.error("ERPNext API Error - URL: %s", url)
+            logger.error("ERPNext API Error - Status: %s", status_code)
+            logger.error("ERPNext API Error - Response Text: %s", response_text[:2000] if response_text else 'No response text')
+            logger.error("ERPNext API Error - Error Message: %s", error_message if error_message else 'No error message')
+            logger.error("ERPNext API Error - Request Data: %s", str(data)[:500])
             
             raise ParsingError(f"Failed to post to ERPNext {endpoint}: {str(e)}. Details: {error_detail}")
         except requests.exceptions.RequestException as e:
@@ -136,8 +172,27 @@ class ERPNextClient:
         Returns:
             Purchase Invoice document data
         """
+        now = time.monotonic()
+        with self._invoice_cache_lock:
+            cached = self._invoice_cache.get(invoice_id)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+        
         endpoint = f"/api/resource/Purchase Invoice/{invoice_id}"
-        return self._get(endpoint)
+        data = self._get(endpoint)
+        
+        with self._invoice_cache_lock:
+            self._invoice_cache.pop(invoice_id, None)
+            if len(self._invoice_cache) >= self.INVOICE_CACHE_MAXSIZE:
+                # Evict the oldest entry (dicts keep insertion order)
+                del self._invoice_cache[next(iter(self._invoice_cache))]
+            self._invoice_cache[invoice_id] = (now + self._invoice_cache_ttl, data)
+        return data
+    
+    def invalidate_invoice(self, invoice_id: str) -> None:
+        """Drop a purchase invoice from the read cache."""
+        with self._invoice_cache_lock:
+            self._invoice_cache.pop(invoice_id, None)
     
     def get_purchase_invoices_by_supplier(
         self, supplier: str, limit: int = 100
@@ -162,6 +217,62 @@ class ERPNextClient:
         result = self._get(endpoint, params=params)
         return result.get('data', [])
     
+    def document_exists(self, doc_type: str, name: str) -> bool:
+        """
+        Check whether a document exists in ERPNext.
+        
+        Requests only the name field instead of loading the full document.
+        
+        Args:
+            doc_type: Document type (e.g., "Supplier")
+            name: Document name
+        
+        Returns:
+            True if the document exists, False otherwise
+        """
+        params = {
+            'filters': json.dumps([["name", "=", name]]),
+            'fields': '["name"]',
+            'limit_page_length': 1
+        }
+        result = self._get(f"/api/resource/{doc_type}", params=params)
+        return bool(result.get('data'))
+    
+    def get_existing_item_codes(self, item_codes: List[str]) -> Set[str]:
+        """
+        Return the subset of item codes that already exist in ERPNext.
+        
+        Uses a single filtered list request rather than one GET per item.
+        
+        Args:
+            item_codes: Item codes to look up
+        
+        Returns:
+            Set of item codes found in ERPNext
+        """
+        if not item_codes:
+            return set()
+        
+        params = {
+            'filters': json.dumps([["name", "in", item_codes]]),
+            'fields': '["name"]',
+            'limit_page_length': len(item_codes)
+        }
+        result = self._get("/api/resource/Item", params=params)
+        return {row.get('name') for row in result.get('data', [])}
+    
+    @staticmethod
+    def _from_purchase_invoice_item(item: Dict[str, Any]) -> InvoiceItem:
+        """Convert an ERPNext Purchase Invoice Item row to an InvoiceItem."""
+        quantity = float(item.get('qty', 0))
+        rate = float(item.get('rate', 0))
+        return InvoiceItem(
+            name=item.get('item_name') or item.get('item_code', 'Unknown Item'),
+            quantity=quantity,
+            unit_price=rate,
+            total_price=float(item.get('amount', quantity * rate))
+        )
+    
     def parse_erpnext_invoice(self, erpnext_data: Dict[str, Any]) -> ParsedInvoice:
         """
         Convert ERPNext Purchase Invoice to ParsedInvoice model.
@@ -174,21 +285,10 @@ class ERPNextClient:
         """
         try:
             # Extract invoice items
-            items = []
-            erpnext_items = erpnext_data.get('items', [])
-            
-            for item in erpnext_items:
-                item_name = item.get('item_name') or item.get('item_code', 'Unknown Item')
-                quantity = float(item.get('qty', 0))
-                rate = float(item.get('rate', 0))
-                amount = float(item.get('amount', quantity * rate))
-                
-                items.append(InvoiceItem(
-                    name=item_name,
-                    quantity=quantity,
-                    unit_price=rate,
-                    total_price=amount
-                ))
+            items = [
+                self._from_purchase_invoice_item(item)
+                for item in erpnext_data.get('items', [])
+            ]
             
             # Parse date
             posting_date_str = erpnext_data.get('posting_date')
@@ -267,6 +367,21 @@ class ERPNextClient:
         
         return parsed_invoices
     
+    @staticmethod
+    def _to_purchase_invoice_item(item: InvoiceItem) -> Dict[str, Any]:
+        """Convert an InvoiceItem to an ERPNext Purchase Invoice Item row."""
+        # "Nos" requires integer quantities, so use "Unit" for decimals
+        qty = item.quantity
+        return {
+            "doctype": "Purchase Invoice Item",
+            "item_code": item.name,  # Use item name as item code
+            "item_name": item.name,
+            "qty": qty,
+            "rate": item.unit_price,
+            "amount": item.total_price,
+            "uom": "Nos" if qty.is_integer() else "Unit"
+        }
+    
     def create_purchase_invoice(self, parsed_invoice: ParsedInvoice, risk_score: Optional[int] = None, risk_explanation: Optional[str] = None) -> Dict[str, Any]:
         """
         Create a Purchase Invoice in ERPNext from a ParsedInvoice.
@@ -282,8 +397,11 @@ class ERPNextClient:
         
         # Check if supplier exists
         try:
-            supplier_check = self._get(f"/api/resource/Supplier/{supplier_name}")
-        except:
+            supplier_exists = self.document_exists("Supplier", supplier_name)
+        except ParsingError:
+            supplier_exists = False
+        
+        if not supplier_exists:
             # Supplier doesn't exist, create it
             try:
                 supplier_data = {
@@ -299,13 +417,14 @@ class ERPNextClient:
         # Prepare Purchase Invoice data
         # Note: ERPNext typically requires a "company" field - try to get default company
         # If not available, we'll let ERPNext error tell us what's needed
+        invoice_date = parsed_invoice.invoice_date.strftime("%Y-%m-%d")
         invoice_data = {
             "doctype": "Purchase Invoice",
             "supplier": supplier_name,
-            "posting_date": parsed_invoice.invoice_date.strftime("%Y-%m-%d"),
-            "due_date": parsed_invoice.invoice_date.strftime("%Y-%m-%d"),
+            "posting_date": invoice_date,
+            "due_date": invoice_date,
             "bill_no": parsed_invoice.invoice_number,
-            "bill_date": parsed_invoice.invoice_date.strftime("%Y-%m-%d"),
+            "bill_date": invoice_date,
             "items": [],
             "currency": parsed_invoice.currency,
         }
@@ -318,86 +437,74 @@ class ERPNextClient:
             if companies.get("data") and len(companies["data"]) > 0:
                 company_name = companies["data"][0].get("name", "")
                 invoice_data["company"] = company_name
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.info(f"Found company: {company_name}")
+                logger.info("Found company: %s", company_name)
         except Exception as e:
             # If we can't get company, try common default names
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Could not fetch company list: {str(e)}")
+            logger.warning("Could not fetch company list: %s", e)
             # Try common default company names
             for default_company in ["Your Company", "Company", "Default Company"]:
                 try:
                     # Test if company exists
-                    test_company = self._get(f"/api/resource/Company/{default_company}")
-                    if test_company.get("name"):
+                    if self.document_exists("Company", default_company):
                         invoice_data["company"] = default_company
-                        logger.info(f"Using default company: {default_company}")
+                        logger.info("Using default company: %s", default_company)
                         break
                 except:
                     continue
         
         # If still no company, ERPNext will error and tell us what's needed
         if "company" not in invoice_data:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.warning("No company field set - ERPNext may require it")
         
         # Create items in ERPNext if they don't exist (BEFORE creating invoice)
         # ERPNext requires items to exist before they can be used in Purchase Invoice
-        import logging
-        logger = logging.getLogger(__name__)
+        # Look up all item codes in one request instead of one GET per item
+        item_codes = list(dict.fromkeys(item.name for item in parsed_invoice.items))
+        try:
+            existing_items = self.get_existing_item_codes(item_codes)
+        except ParsingError as e:
+            logger.warning("Could not check existing items: %s", e)
+            existing_items = set()
         
-        for item in parsed_invoice.items:
-            item_code = item.name
+        missing_items = []
+        for item_code in item_codes:
+            if item_code in existing_items:
+                logger.info("Item '%s' already exists in ERPNext", item_code)
+            else:
+                missing_items.append({
+                    "doctype": "Item",
+                    "item_code": item_code,
+                    "item_name": item_code,
+                    "item_group": "Products",  # Default item group
+                    "stock_uom": "Nos",  # Default unit of measure
+                    "is_stock_item": 0,  # Not a stock item (service item)
+                })
+        
+        if missing_items:
+            # Create all missing items in a single insert_many call
             try:
-                # Check if item exists
-                self._get(f"/api/resource/Item/{item_code}")
-                logger.info(f"Item '{item_code}' already exists in ERPNext")
-            except:
-                # Item doesn't exist, create it
-                try:
-                    logger.info(f"Creating item '{item_code}' in ERPNext...")
-                    item_data = {
-                        "doctype": "Item",
-                        "item_code": item_code,
-                        "item_name": item.name,
-                        "item_group": "Products",  # Default item group
-                        "stock_uom": "Nos",  # Default unit of measure
-                        "is_stock_item": 0,  # Not a stock item (service item)
-                    }
-                    self._post("/api/resource/Item", item_data)
-                    logger.info(f"✓ Item '{item_code}' created successfully")
-                except Exception as item_error:
-                    logger.warning(f"Could not create item '{item_code}': {str(item_error)}")
-                    # Continue anyway - ERPNext might allow using item_name directly
+                logger.info("Creating %s item(s) in ERPNext...", len(missing_items))
+                self._post("/api/method/frappe.client.insert_many", {"docs": missing_items})
+                logger.info("✓ %s item(s) created successfully", len(missing_items))
+            except Exception as bulk_error:
+                logger.warning("Bulk item creation failed, creating items one by one: %s", bulk_error)
+                for item_data in missing_items:
+                    item_code = item_data["item_code"]
+                    try:
+                        self._post("/api/resource/Item", item_data)
+                        logger.info("✓ Item '%s' created successfully", item_code)
+                    except Exception as item_error:
+                        logger.warning("Could not create item '%s': %s", item_code, item_error)
+                        # Continue anyway - ERPNext might allow using item_name directly
         
         # Add items with proper ERPNext structure (after ensuring they exist)
-        for item in parsed_invoice.items:
-            # Determine UOM based on quantity type
-            # "Nos" requires integer quantities, so use "Unit" for decimals
-            qty = item.quantity
-            if qty == int(qty):
-                # Integer quantity - use "Nos"
-                uom = "Nos"
-            else:
-                # Decimal quantity - use "Unit" which allows decimals
-                uom = "Unit"
-            
-            item_data = {
-                "doctype": "Purchase Invoice Item",
-                "item_code": item.name,  # Use item name as item code
-                "item_name": item.name,
-                "qty": qty,
-                "rate": item.unit_price,
-                "amount": item.total_price,
-                "uom": uom
-            }
-            invoice_data["items"].append(item_data)
+        invoice_data["items"] = [
+            self._to_purchase_invoice_item(item) for item in parsed_invoice.items
+        ]
         
         # Log the invoice data being sent (for debugging)
-        logger.info(f"Creating Purchase Invoice with data: {str(invoice_data)[:500]}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Creating Purchase Invoice with data: %s", str(invoice_data)[:500])
         
         # Create the Purchase Invoice
         # Use "Purchase Invoice" (with space) - this is the correct document type name
@@ -418,18 +525,15 @@ class ERPNextClient:
                 # Re-raise other errors
                 raise
         
-        invoice_name = result.get("data", {}).get("name", "Unknown")
+        # Latest saved version of the document (the create response already
+        # carries it, so no re-fetch is needed before updating/submitting)
+        latest_doc = result.get("data", {})
+        invoice_name = latest_doc.get("name", "Unknown")
         
         # Add risk score as a comment in ERPNext (if provided)
         if risk_score is not None:
             try:
-                import logging
-                import time
-                logger = logging.getLogger(__name__)
-                logger.info(f"Adding risk score ({risk_score}/100) to ERPNext invoice {invoice_name}...")
-                
-                # Small delay to ensure invoice is fully saved
-                time.sleep(0.3)
+                logger.info("Adding risk score (%s/100) to ERPNext invoice %s...", risk_score, invoice_name)
                 
                 # Create a comment with risk score information
                 comment_text = f"🤖 AI Risk Score: {risk_score}/100"
@@ -448,14 +552,12 @@ class ERPNextClient:
                 
                 try:
                     self._post("/api/resource/Comment", comment_data)
-                    logger.info(f"✓ Risk score added as comment to invoice {invoice_name}")
+                    logger.info("✓ Risk score added as comment to invoice %s", invoice_name)
                 except Exception as comment_error:
                     # If comment creation fails, try adding to notes field instead
-                    logger.warning(f"Could not add comment, trying notes field: {str(comment_error)}")
+                    logger.warning("Could not add comment, trying notes field: %s", comment_error)
                     try:
-                        # Fetch the invoice first
-                        fresh_doc = self._get(f"/api/resource/{working_doc_type}/{invoice_name}")
-                        doc_data = fresh_doc.get("data", {})
+                        doc_data = dict(latest_doc)
                         
                         # Update the invoice with notes field containing risk score
                         doc_data["notes"] = f"AI Risk Score: {risk_score}/100"
@@ -466,43 +568,69 @@ class ERPNextClient:
                         url = f"{self.base_url}/api/resource/{working_doc_type}/{invoice_name}"
                         response = self.session.put(url, json=doc_data, timeout=15)
                         response.raise_for_status()
-                        logger.info(f"✓ Risk score added to notes field")
+                        latest_doc = response.json().get("data", doc_data)
+                        logger.info("✓ Risk score added to notes field")
                     except Exception as update_error:
-                        logger.warning(f"Could not add risk score to ERPNext invoice: {str(update_error)}")
+                        logger.warning("Could not add risk score to ERPNext invoice: %s", update_error)
             except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to add risk score to ERPNext: {str(e)}")
+                logger.warning("Failed to add risk score to ERPNext: %s", e)
         
         # Auto-submit the invoice using ERPNext's method API
         if working_doc_type:
             try:
-                import logging
-                import time
-                logger = logging.getLogger(__name__)
-                logger.info(f"Submitting invoice {invoice_name} in ERPNext...")
-                
-                # Small delay to ensure document is fully saved
-                time.sleep(0.5)
-                
-                # Fetch the document fresh to get the latest timestamp
-                fresh_doc = self._get(f"/api/resource/{working_doc_type}/{invoice_name}")
-                doc_data = fresh_doc.get("data", {})
+                logger.info("Submitting invoice %s in ERPNext...", invoice_name)
                 
                 # ERPNext submit uses method API - need to pass the full doc with timestamp
                 submit_data = {
-                    "doc": doc_data  # Use the fresh document data with correct timestamp
+                    "doc": latest_doc  # Latest saved document data with correct timestamp
                 }
                 submit_result = self._post("/api/method/frappe.client.submit", submit_data)
-                logger.info(f"✓ Invoice {invoice_name} submitted successfully in ERPNext")
+                logger.info("✓ Invoice %s submitted successfully in ERPNext", invoice_name)
             except Exception as e:
                 # If submit fails, invoice is still created as draft
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to auto-submit invoice {invoice_name}: {e}")
+                logger.warning("Failed to auto-submit invoice %s: %s", invoice_name, e)
                 logger.warning("Invoice created as Draft - you can submit it manually in ERPNext")
         
         # Notification feature can be added later if needed
         # For now, we'll skip it since the method doesn't exist
         
-        return result
\ No newline at end of file
+        # The invoice may have been updated/submitted above
+        self.invalidate_invoice(invoice_name)
+        
+        return result
+
+
+# Shared client instance, created lazily by get_erpnext_client()
+_erpnext_client: Optional[ERPNextClient] = None
+_erpnext_client_lock = threading.Lock()
+
+
+def get_erpnext_client() -> Optional[ERPNextClient]:
+    """
+    Get the shared ERPNext client, creating it on first use.
+    
+    Uses double-checked locking so concurrent first requests build only one
+    client (and one connection pool).
+    
+    Returns:
+        The shared ERPNextClient, or None if ERPNext is not configured
+    """
+    global _erpnext_client
+    if _erpnext_client is None and Config.validate_erpnext_config():
+        with _erpnext_client_lock:
+            if _erpnext_client is None:
+                _erpnext_client = ERPNextClient(
+                    base_url=Config.ERPNEXT_BASE_URL,
+                    api_key=Config.ERPNEXT_API_KEY,
+                    api_secret=Config.ERPNEXT_API_SECRET
+                )
+    return _erpnext_client
+
+
+def close_erpnext_client() -> None:
+    """Close the shared ERPNext client, if one was created."""
+    global _erpnext_client
+    with _erpnext_client_lock:
+        if _erpnext_client is not None:
+            _erpnext_client.close()
+            _erpnext_client = None
@@ -1,38 +1,132 @@
 """Invoice parsing service (OCR/AI extraction)."""
+import hashlib
+import io
+import threading
 import uuid
 import re
 import json
+from collections import OrderedDict
 from datetime import datetime
-from typing import BinaryIO
+from functools import lru_cache
+from typing import BinaryIO, Optional, Set, Tuple, Union
 from app.models.invoice import ParsedInvoice, InvoiceItem
-from app.exceptions import ParsingError, InvalidInvoiceFormatError
+from app.exceptions import ParsingError
 
+# PDF libraries are resolved once at import time rather than on every parse
 try:
     import pdfplumber
-    PDF_PARSING_AVAILABLE = True
 except ImportError:
-    PDF_PARSING_AVAILABLE = False
-    try:
-        import PyPDF2
-        PDF_PARSING_AVAILABLE = True
-    except ImportError:
-        PDF_PARSING_AVAILABLE = False
+    pdfplumber = None
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+PDF_PARSING_AVAILABLE = pdfplumber is not None or PyPDF2 is not None
+
+# PDF header marker; readers accept it anywhere in the first 1024 bytes
+PDF_MAGIC = b'%PDF-'
+PDF_MAGIC_SEARCH_BYTES = 1024
+
+# Lookup tables used in the per-row/per-word parsing loops
+ITEM_HEADER_NAMES = frozenset({'item', 'item name', 'description', 'product', 'name'})
+ITEM_FILLER_WORDS = frozenset({'x', 'at', 'each', 'per', 'unit'})
+NON_ITEM_ROW_WORDS = ('total', 'subtotal', 'tax', 'discount', 'item', 'description')
+
+# Removes currency symbols, thousands separators and spaces in one pass
+AMOUNT_STRIP_TABLE = str.maketrans('', '', '$, ')
+
+
+def clean_amount(value: str) -> str:
+    """Strip '$', ',' and spaces from an amount string (e.g. '$1,250.00' -> '1250.00')."""
+    return value.translate(AMOUNT_STRIP_TABLE)
+
+
+def cell_text(cell) -> str:
+    """Return a table cell as stripped text ('' for empty/None cells)."""
+    return str(cell).strip() if cell else ""
+
+
+# Date formats tried in order when parsing invoice dates
+MONTH_NAME_DATE_FORMATS = (
+    '%B %d, %Y',      # January 15, 2024
+    '%b %d, %Y',      # Jan 15, 2024
+)
+DATE_FORMATS = MONTH_NAME_DATE_FORMATS + (
+    '%m/%d/%Y',       # 01/15/2024
+    '%d/%m/%Y',       # 15/01/2024
+    '%Y-%m-%d',       # 2024-01-15
+    '%d-%m-%Y',       # 15-01-2024
+    '%m-%d-%Y',       # 01-15-2024
+)
+
+
+@lru_cache(maxsize=1024)
+def parse_date(date_str: str, formats: Tuple[str, ...] = DATE_FORMATS) -> Optional[datetime]:
+    """
+    Parse a date string with the first matching format.
+    
+    Results are cached since the same date strings recur across invoices.
+    
+    Returns:
+        The parsed datetime, or None if no format matches
+    """
+    # Fast path for ISO dates (2024-01-15), skipping the strptime attempts
+    if '%Y-%m-%d' in formats and len(date_str) == 10 and date_str[4] == '-' \
+            and date_str[7] == '-' and date_str.replace('-', '').isdigit():
+        try:
+            return datetime.fromisoformat(date_str)
+        except ValueError:
+            return None
+    
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+# Number of parsed PDFs remembered by content hash
+PARSE_CACHE_MAXSIZE = 256
+
+# Read size used when hashing file content
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def hash_stream(stream: BinaryIO) -> str:
+    """SHA-256 hex digest of a seekable stream's content, read in chunks and rewound."""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    while chunk := stream.read(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
 
 
 class ParserService:
     """Service for parsing invoices from various formats."""
     
-    def parse_invoice(self, file_content: bytes, filename: str) -> ParsedInvoice:
+    def __init__(self):
+        # SHA-256 of PDF content -> parsed invoice, least recently used first
+        self._parse_cache: "OrderedDict[str, ParsedInvoice]" = OrderedDict()
+        self._parse_cache_lock = threading.Lock()
+    
+    def parse_invoice(self, file_content: Union[bytes, BinaryIO], filename: str) -> ParsedInvoice:
         """
         Parse invoice from file content.
         
+        Accepts raw bytes or a seekable binary file (e.g. an upload's spooled
+        temporary file), which is read in place rather than copied into memory.
         Tries to extract data from PDF, falls back to mock if parsing fails.
         """
         try:
             # Try to parse as PDF first
-            if filename.lower().endswith('.pdf'):
+            if filename[-4:].lower() == '.pdf':
                 try:
-                    parsed_data = self._parse_pdf(file_content, filename)
+                    stream = file_content if hasattr(file_content, 'read') else io.BytesIO(file_content)
+                    parsed_data = self._parse_pdf_cached(stream, filename)
                     if parsed_data:
                         return parsed_data
                 except Exception as e:
@@ -46,66 +140,104 @@ class ParserService:
         except Exception as e:
             raise ParsingError(f"Failed to parse invoice: {str(e)}")
     
-    def _parse_pdf(self, file_content: bytes, filename: str) -> ParsedInvoice:
+    def _parse_pdf_cached(self, stream: BinaryIO, filename: str) -> Optional[ParsedInvoice]:
+        """
+        Parse a PDF, reusing the result of an earlier parse of identical content.
+        
+        Only successful PDF parses are cached; callers get their own copy.
+        Parses that fell back to a generated invoice number or the current
+        date are not cached, so each upload of such a file gets fresh values.
+        """
+        key = hash_stream(stream)
+        with self._parse_cache_lock:
+            cached = self._parse_cache.get(key)
+            if cached is not None:
+                self._parse_cache.move_to_end(key)
+                return cached.model_copy(deep=True)
+        
+        fallbacks: Set[str] = set()
+        parsed_data = self._parse_pdf(stream, filename, fallbacks)
+        if parsed_data and not fallbacks:
+            with self._parse_cache_lock:
+                self._parse_cache[key] = parsed_data.model_copy(deep=True)
+                if len(self._parse_cache) > PARSE_CACHE_MAXSIZE:
+                    self._parse_cache.popitem(last=False)
+        return parsed_data
+    
+    def _parse_pdf(
+        self, stream: BinaryIO, filename: str, fallbacks: Optional[Set[str]] = None
+    ) -> ParsedInvoice:
         """
         Parse invoice from PDF file.
         
-        Extracts text from PDF and tries to identify invoice data.
+        Extracts text from PDF and tries to identify invoice data. Names of
+        fields filled with generated defaults are added to `fallbacks`.
         """
         if not PDF_PARSING_AVAILABLE:
             return None
         
+        # Skip both PDF readers for empty or non-PDF content
+        stream.seek(0)
+        head = stream.read(PDF_MAGIC_SEARCH_BYTES)
+        stream.seek(0)
+        if not head or PDF_MAGIC not in head:
+            return None
+        
         try:
-            import io
-            from pdfplumber import PDF
+            if pdfplumber is None:
+                raise ImportError("pdfplumber is not installed")
             
             # Try pdfplumber first (better for table extraction)
-            pdf_file = io.BytesIO(file_content)
-            pdf = PDF(pdf_file)
-            
-            # Try to extract tables first (more accurate)
+            # The stream belongs to the caller, so closing the PDF must not close it
+            pdf = pdfplumber.PDF(stream, stream_is_external=True)
             tables = []
-            for page in pdf.pages:
-                page_tables = page.extract_tables()
-                if page_tables:
-                    tables.extend(page_tables)
+            page_texts = []
+            try:
+                # Single pass over the pages, collecting tables and text together
+                for page in pdf.pages:
+                    # Pages without any characters (e.g. scanned images) cannot
+                    # yield tables or text, so skip extraction for them entirely
+                    if not page.chars:
+                        continue
+                    # Tables are more accurate; text is needed for metadata either way
+                    page_tables = page.extract_tables()
+                    if page_tables:
+                        tables.extend(page_tables)
+                    page_text = page.extract_text()
+                    if page_text:
+                        page_texts.append(page_text)
+            finally:
+                pdf.close()
             
-            # Extract text first (needed for metadata even if we use tables)
-            full_text = ""
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    full_text += page_text + "\n"
+            # Join once instead of growing a string page by page
+            full_text = "\n".join(page_texts) + "\n" if page_texts else ""
             
             # If we found tables, try to extract from table structure
             if tables:
-                parsed_data = self._extract_from_tables(tables, filename, full_text)
+                parsed_data = self._extract_from_tables(tables, filename, full_text, fallbacks)
                 if parsed_data:
-                    pdf.close()
                     return parsed_data
             
-            pdf.close()
-            
             # Fallback to text extraction
             if full_text and len(full_text.strip()) >= 50:
-                parsed_data = self._extract_from_text(full_text, filename)
+                parsed_data = self._extract_from_text(full_text, filename, fallbacks)
                 if parsed_data:
                     return parsed_data
                 
         except Exception as e:
             # Try PyPDF2 as fallback
             try:
-                import io
-                import PyPDF2
+                if PyPDF2 is None:
+                    return None
                 
-                pdf_file = io.BytesIO(file_content)
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
+                stream.seek(0)
+                pdf_reader = PyPDF2.PdfReader(stream)
                 
-                full_text = ""
-                for page in pdf_reader.pages:
-                    full_text += page.extract_text() or ""
+                full_text = "".join(
+                    page.extract_text() or "" for page in pdf_reader.pages
+                )
                 
-                parsed_data = self._extract_from_text(full_text, filename)
+                parsed_data = self._extract_from_text(full_text, filename, fallbacks)
                 if parsed_data:
                     return parsed_data
             except Exception:
@@ -113,7 +245,10 @@ class ParserService:
         
         return None
     
-    def _extract_from_tables(self, tables: list, filename: str, full_text: str = "") -> ParsedInvoice:
+    def _extract_from_tables(
+        self, tables: list, filename: str, full_text: str = "",
+        fallbacks: Optional[Set[str]] = None
+    ) -> ParsedInvoice:
         """
         Extract invoice data from PDF tables.
         
@@ -153,21 +288,19 @@ class ParserService:
                 match = re.search(pattern, full_text, re.IGNORECASE)
                 if match:
                     date_str = match.group(1).strip()
-                    try:
-                        invoice_date = datetime.strptime(date_str, '%B %d, %Y')
+                    invoice_date = parse_date(date_str, MONTH_NAME_DATE_FORMATS)
+                    if invoice_date:
                         break
-                    except:
-                        try:
-                            invoice_date = datetime.strptime(date_str, '%b %d, %Y')
-                            break
-                        except:
-                            pass
         
         # Set defaults if not found
         if not invoice_number:
             invoice_number = f"INV-{str(uuid.uuid4())[:8]}"
+            if fallbacks is not None:
+                fallbacks.add("invoice_number")
         if not invoice_date:
             invoice_date = datetime.now()
+            if fallbacks is not None:
+                fallbacks.add("invoice_date")
         
         for table in tables:
             if not table or len(table) < 2:
@@ -183,32 +316,45 @@ class ParserService:
             
             if has_item_col and has_qty_col:
                 # This is likely the items table
+                # Classify each column once per table instead of re-testing headers per row
+                column_roles = []
+                total_columns = []
+                for i, header in enumerate(headers):
+                    if 'item' in header or 'name' in header:
+                        column_roles.append('name')
+                    elif 'quantity' in header or 'qty' in header:
+                        column_roles.append('qty')
+                    elif 'unit' in header or ('price' in header and 'total' not in header):
+                        column_roles.append('unit')
+                    else:
+                        column_roles.append(None)
+                    if 'total' in header and ('amount' in header or 'price' in header):
+                        total_columns.append(i)
+                
                 for row in table[1:]:
                     if not row or len(row) < 2:
                         continue
                     
+                    # Stringify the cells under known headers once per row
+                    cells = [cell_text(cell) for cell in row[:len(headers)]]
+                    
                     # Find item name column
                     item_name = None
                     qty = None
                     unit_price = None
                     
-                    for i, header in enumerate(headers):
-                        if i >= len(row):
-                            break
-                        cell_value = str(row[i]).strip() if row[i] else ""
-                        
-                        if 'item' in header or 'name' in header:
+                    for role, cell_value in zip(column_roles, cells):
+                        if role == 'name':
                             item_name = cell_value
-                        elif 'quantity' in header or 'qty' in header:
+                        elif role == 'qty':
                             try:
                                 qty = float(cell_value)
                             except:
                                 pass
-                        elif 'unit' in header or ('price' in header and 'total' not in header):
+                        elif role == 'unit':
                             try:
                                 # Remove $ and commas
-                                price_str = cell_value.replace('$', '').replace(',', '')
-                                unit_price = float(price_str)
+                                unit_price = float(clean_amount(cell_value))
                             except:
                                 pass
                     
@@ -217,34 +363,29 @@ class ParserService:
                         item_name = item_name.strip()
                         
                         # Skip empty or header-like rows
-                        if not item_name or item_name.lower() in ['item', 'item name', 'description', 'product', 'name']:
+                        if not item_name or item_name.lower() in ITEM_HEADER_NAMES:
                             continue
                         
                         # Try to get total price from table if available
                         total_price = None
-                        for i, header in enumerate(headers):
-                            if i >= len(row):
+                        for i in total_columns:
+                            if i >= len(cells):
                                 break
-                            cell_value = str(row[i]).strip() if row[i] else ""
-                            if 'total' in header.lower() and ('amount' in header.lower() or 'price' in header.lower()):
-                                try:
-                                    price_str = cell_value.replace('$', '').replace(',', '').replace(' ', '')
-                                    if price_str:
-                                        total_price = float(price_str)
-                                        break
-                                except:
-                                    pass
+                            try:
+                                price_str = clean_amount(cells[i])
+                                if price_str:
+                                    total_price = float(price_str)
+                                    break
+                            except:
+                                pass
                         
                         # If we don't have total_price, try to find it in other columns
                         if total_price is None:
-                            for i, header in enumerate(headers):
-                                if i >= len(row):
-                                    break
-                                cell_value = str(row[i]).strip() if row[i] else ""
+                            for cell_value in cells:
                                 # Look for any column that might contain total/amount
                                 if cell_value and ('$' in cell_value or (cell_value.replace('.', '').replace(',', '').isdigit() and float(cell_value.replace(',', '')) > 100)):
                                     try:
-                                        price_str = cell_value.replace('$', '').replace(',', '').replace(' ', '')
+                                        price_str = clean_amount(cell_value)
                                         if price_str:
                                             potential_total = float(price_str)
                                             # If this looks like a total (larger than unit price would be)
@@ -290,16 +431,18 @@ class ParserService:
                 if not row:
                     continue
                 row_text = " ".join([str(cell) for cell in row if cell]).lower()
+                # Stringify each cell once for all the metadata checks below
+                row_cells = [cell_text(cell) for cell in row]
                 
                 # Extract invoice number - look for "Invoice Number:" label
                 if 'invoice' in row_text and 'number' in row_text:
-                    for i, cell in enumerate(row):
-                        if cell:
-                            cell_str = str(cell).strip()
+                    for i, cell_str in enumerate(row_cells):
+                        if cell_str:
+                            cell_lower = cell_str.lower()
                             # If this cell contains "Invoice Number:", get value from next cell
-                            if 'invoice' in cell_str.lower() and 'number' in cell_str.lower():
+                            if 'invoice' in cell_lower and 'number' in cell_lower:
                                 if i + 1 < len(row) and row[i + 1]:
-                                    potential_inv = str(row[i + 1]).strip()
+                                    potential_inv = row_cells[i + 1]
                                     if 'inv' in potential_inv.lower() or re.match(r'[A-Z0-9\-]+', potential_inv):
                                         invoice_number = potential_inv
                                         break
@@ -310,9 +453,8 @@ class ParserService:
                 
                 # Also check for standalone INV pattern in any cell
                 if not invoice_number or invoice_number.startswith('INV-') and len(invoice_number) < 10:
-                    for cell in row:
-                        if cell:
-                            cell_str = str(cell).strip()
+                    for cell_str in row_cells:
+                        if cell_str:
                             # Look for INV-2024-001 pattern
                             inv_match = re.search(r'INV[-\s]*([0-9]{4}[-\s]*[0-9]+)', cell_str, re.IGNORECASE)
                             if inv_match:
@@ -322,28 +464,28 @@ class ParserService:
                 
                 # Extract vendor
                 if 'vendor' in row_text:
-                    for i, cell in enumerate(row):
-                        if cell:
-                            cell_str = str(cell).strip()
+                    for i, cell_str in enumerate(row_cells):
+                        if cell_str:
+                            cell_lower = cell_str.lower()
                             # If this is the label, get the value from next column
-                            if 'vendor' in cell_str.lower() and i + 1 < len(row) and row[i + 1]:
-                                vendor_name = str(row[i + 1]).strip()
+                            if 'vendor' in cell_lower and i + 1 < len(row) and row[i + 1]:
+                                vendor_name = row_cells[i + 1]
                                 break
                             # Or if vendor name is in this cell
-                            elif 'abc' in cell_str.lower() or 'supplies' in cell_str.lower():
+                            elif 'abc' in cell_lower or 'supplies' in cell_lower:
                                 vendor_name = cell_str
                                 break
                 
                 # Extract invoice date from tables
                 if 'invoice' in row_text and 'date' in row_text:
-                    for i, cell in enumerate(row):
-                        if cell:
-                            cell_str = str(cell).strip()
+                    for i, cell_str in enumerate(row_cells):
+                        if cell_str:
+                            cell_lower = cell_str.lower()
                             # If this cell contains "Invoice Date:" or "Date:", get value from next cell
-                            if ('invoice' in cell_str.lower() and 'date' in cell_str.lower()) or \
-                               (cell_str.lower().startswith('date') and ':' in cell_str):
+                            if ('invoice' in cell_lower and 'date' in cell_lower) or \
+                               (cell_lower.startswith('date') and ':' in cell_str):
                                 if i + 1 < len(row) and row[i + 1]:
-                                    date_str = str(row[i + 1]).strip()
+                                    date_str = row_cells[i + 1]
                                 else:
                                     # Date might be in the same cell after colon
                                     if ':' in cell_str:
@@ -352,42 +494,23 @@ class ParserService:
                                         continue
                                 
                                 # Try to parse the date
-                                date_formats = [
-                                    '%B %d, %Y',      # January 15, 2024
-                                    '%b %d, %Y',      # Jan 15, 2024
-                                    '%m/%d/%Y',       # 01/15/2024
-                                    '%d/%m/%Y',       # 15/01/2024
-                                    '%Y-%m-%d',       # 2024-01-15
-                                    '%d-%m-%Y',       # 15-01-2024
-                                    '%m-%d-%Y',       # 01-15-2024
-                                ]
-                                for fmt in date_formats:
-                                    try:
-                                        invoice_date = datetime.strptime(date_str, fmt)
-                                        break
-                                    except:
-                                        continue
+                                parsed_date = parse_date(date_str)
+                                if parsed_date:
+                                    invoice_date = parsed_date
                                 if invoice_date:
                                     break
                 
                 # Also check for standalone date patterns in any cell
                 if not invoice_date or invoice_date == datetime.now():
-                    for cell in row:
-                        if cell:
-                            cell_str = str(cell).strip()
+                    for cell_str in row_cells:
+                        if cell_str:
                             # Look for "January 15, 2024" pattern
                             date_match = re.search(r'([A-Za-z]+\s+\d{1,2},\s+\d{4})', cell_str)
                             if date_match:
-                                date_str = date_match.group(1)
-                                try:
-                                    invoice_date = datetime.strptime(date_str, '%B %d, %Y')
+                                parsed_date = parse_date(date_match.group(1), MONTH_NAME_DATE_FORMATS)
+                                if parsed_date:
+                                    invoice_date = parsed_date
                                     break
-                                except:
-                                    try:
-                                        invoice_date = datetime.strptime(date_str, '%b %d, %Y')
-                                        break
-                                    except:
-                                        pass
         
         # Calculate total
         total_amount = sum(item.total_price for item in items)
@@ -404,8 +527,7 @@ class ParserService:
                             cell_str = str(cell)
                             if '$' in cell_str:
                                 try:
-                                    total_str = cell_str.replace('$', '').replace(',', '').strip()
-                                    total_amount = float(total_str)
+                                    total_amount = float(clean_amount(cell_str))
                                     break
                                 except:
                                     pass
@@ -422,7 +544,9 @@ class ParserService:
         
         return None
     
-    def _extract_from_text(self, text: str, filename: str) -> ParsedInvoice:
+    def _extract_from_text(
+        self, text: str, filename: str, fallbacks: Optional[Set[str]] = None
+    ) -> ParsedInvoice:
         """
         Extract invoice data from text content.
         
@@ -469,6 +593,8 @@ class ParserService:
         # If still not found, generate a default
         if not invoice_number:
             invoice_number = f"INV-{str(uuid.uuid4())[:8]}"
+            if fallbacks is not None:
+                fallbacks.add("invoice_number")
         
         # Extract invoice date - look for patterns like "January 15, 2024"
         invoice_date = None
@@ -483,32 +609,16 @@ class ParserService:
         for pattern in date_patterns:
             match = re.search(pattern, text, re.IGNORECASE)
             if match:
-                try:
-                    date_str = match.group(1).strip()
-                    # Try to parse common date formats
-                    date_formats = [
-                        '%B %d, %Y',      # January 15, 2024
-                        '%b %d, %Y',      # Jan 15, 2024
-                        '%m/%d/%Y',       # 01/15/2024
-                        '%d/%m/%Y',       # 15/01/2024
-                        '%Y-%m-%d',       # 2024-01-15
-                        '%d-%m-%Y',       # 15-01-2024
-                        '%m-%d-%Y',       # 01-15-2024
-                    ]
-                    for fmt in date_formats:
-                        try:
-                            invoice_date = datetime.strptime(date_str, fmt)
-                            break
-                        except:
-                            continue
-                    if invoice_date:
-                        break
-                except Exception as e:
-                    continue
+                # Try to parse common date formats
+                invoice_date = parse_date(match.group(1).strip())
+                if invoice_date:
+                    break
         
         # If still not found, use current date as fallback
         if not invoice_date:
             invoice_date = datetime.now()
+            if fallbacks is not None:
+                fallbacks.add("invoice_date")
         
         # Extract items - look for table-like patterns with item names, quantities, prices
         items = []
@@ -526,9 +636,8 @@ class ParserService:
             
             # Skip header rows
             line_lower = line_stripped.lower()
-            if any(header in line_lower for header in ['item', 'description', 'qty', 'quantity', 'price', 'amount', 'total']):
-                if 'item' in line_lower or 'description' in line_lower:
-                    continue  # Skip header row
+            if 'item' in line_lower or 'description' in line_lower:
+                continue  # Skip header row
             
             # Look for lines that might contain item information
             # Pattern: text (item name) followed by numbers (qty, unit price, total)
@@ -540,21 +649,22 @@ class ParserService:
                 
                 for word in words:
                     # Remove common separators
-                    clean_word = word.replace('$', '').replace(',', '').strip()
+                    clean_word = clean_amount(word)
                     # Check if it's a number
                     try:
                         num = float(clean_word)
                         numbers.append(num)
                     except:
                         # Not a number, might be part of item name
-                        if clean_word and not clean_word.lower() in ['x', 'at', 'each', 'per', 'unit']:
+                        if clean_word and clean_word.lower() not in ITEM_FILLER_WORDS:
                             item_name_parts.append(word)
                 
                 # If we have item name parts and at least one number, it might be an item row
                 if len(item_name_parts) >= 1 and len(numbers) >= 1:
                     item_name = ' '.join(item_name_parts)
                     # Skip if it looks like a header or total row
-                    if any(skip in item_name.lower() for skip in ['total', 'subtotal', 'tax', 'discount', 'item', 'description']):
+                    item_name_lower = item_name.lower()
+                    if any(skip in item_name_lower for skip in NON_ITEM_ROW_WORDS):
                         continue
                     
                     # Try to extract quantity and price
@@ -673,7 +783,7 @@ class ParserService:
         
         return None
     
-    def _mock_parse(self, file_content: bytes, filename: str) -> ParsedInvoice:
+    def _mock_parse(self, file_content: Union[bytes, BinaryIO], filename: str) -> ParsedInvoice:
         """
         Mock parser that simulates invoice extraction.
         
@@ -713,21 +823,3 @@ class ParserService:
             ],
             currency="USD"
         )
-    
-    def parse_invoice_from_json(self, invoice_data: dict) -> ParsedInvoice:
-        """Parse invoice from JSON data (for testing/direct API input)."""
-        try:
-            items = [
-                InvoiceItem(**item) for item in invoice_data.get("items", [])
-            ]
-            
-            return ParsedInvoice(
-                vendor_name=invoice_data["vendor_name"],
-                invoice_number=invoice_data["invoice_number"],
-                invoice_date=datetime.fromisoformat(invoice_data["invoice_date"]),
-                total_amount=invoice_data["total_amount"],
-                items=items,
-                currency=invoice_data.get("currency", "USD")
-            )
-        except (KeyError, ValueError, TypeError) as e:
-            raise InvalidInvoiceFormatError(f"Invalid invoice format: {str(e)}")
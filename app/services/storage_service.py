@@ -1,5 +1,8 @@
 """Storage service for invoices (in-memory for simplicity)."""
+import threading
+from itertools import count, islice
 from typing import Dict, List, Optional
+from app.config import Config
 from app.models.invoice import Invoice
 from app.exceptions import InvoiceNotFoundError
 
@@ -7,41 +10,122 @@ from app.exceptions import InvoiceNotFoundError
 class StorageService:
     """In-memory storage service for invoices."""
     
-    def __init__(self):
+    def __init__(self, max_items: Optional[int] = None):
         self._invoices: Dict[str, Invoice] = {}
+        # Oldest invoices are evicted beyond this many to bound memory use
+        self._max_items = Config.MAX_STORED_INVOICES if max_items is None else max_items
+        # Secondary index: lowercased vendor name -> invoice IDs (dict keeps insertion order)
+        self._by_vendor: Dict[str, Dict[str, None]] = {}
+        # Lowercased vendor name -> version, bumped whenever that vendor's invoices change.
+        # Versions come from one counter so they are never reused, even after clear().
+        self._vendor_versions: Dict[str, int] = {}
+        self._version_counter = count(1)
+        # Parsing, analysis and ERPNext sync call in from worker threads; the
+        # invoice dict and vendor index are only read or changed under this lock
+        self._lock = threading.Lock()
+    
+    def _index(self, invoice: Invoice) -> None:
+        """Add an invoice to the vendor index. Caller must hold the lock."""
+        vendor_key = invoice.parsed_data.vendor_name.lower()
+        self._by_vendor.setdefault(vendor_key, {})[invoice.id] = None
+        self._vendor_versions[vendor_key] = next(self._version_counter)
+    
+    def _unindex(self, invoice: Invoice) -> None:
+        """Remove an invoice from the vendor index. Caller must hold the lock."""
+        vendor_key = invoice.parsed_data.vendor_name.lower()
+        self._vendor_versions[vendor_key] = next(self._version_counter)
+        ids = self._by_vendor.get(vendor_key)
+        if ids is not None:
+            ids.pop(invoice.id, None)
+            if not ids:
+                del self._by_vendor[vendor_key]
     
     def save(self, invoice: Invoice) -> Invoice:
         """Save an invoice."""
-        self._invoices[invoice.id] = invoice
+        with self._lock:
+            existing = self._invoices.get(invoice.id)
+            if existing is not None:
+                self._unindex(existing)
+            self._invoices[invoice.id] = invoice
+            self._index(invoice)
+            while len(self._invoices) > self._max_items:
+                # Dicts keep insertion order, so the first key is the oldest invoice
+                oldest_id = next(iter(self._invoices))
+                self._unindex(self._invoices.pop(oldest_id))
         return invoice
     
     def get(self, invoice_id: str) -> Invoice:
         """Get an invoice by ID."""
-        if invoice_id not in self._invoices:
+        with self._lock:
+            invoice = self._invoices.get(invoice_id)
+        if invoice is None:
             raise InvoiceNotFoundError(f"Invoice {invoice_id} not found")
-        return self._invoices[invoice_id]
+        return invoice
+    
+    def get_all(self, limit: Optional[int] = None, offset: int = 0) -> List[Invoice]:
+        """Get all invoices, optionally paginated with limit/offset."""
+        stop = None if limit is None else offset + limit
+        with self._lock:
+            return list(islice(self._invoices.values(), offset, stop))
     
-    def get_all(self) -> List[Invoice]:
-        """Get all invoices."""
-        return list(self._invoices.values())
+    def count(self) -> int:
+        """Get the total number of stored invoices."""
+        with self._lock:
+            return len(self._invoices)
     
     def get_by_vendor(self, vendor_name: str) -> List[Invoice]:
         """Get all invoices for a specific vendor."""
-        return [
-            invoice for invoice in self._invoices.values()
-            if invoice.parsed_data.vendor_name.lower() == vendor_name.lower()
-        ]
+        with self._lock:
+            ids = self._by_vendor.get(vendor_name.lower(), ())
+            return [self._invoices[invoice_id] for invoice_id in ids]
+    
+    def vendor_version(self, vendor_name: str) -> int:
+        """Get a version number that changes whenever the vendor's invoices change."""
+        with self._lock:
+            return self._vendor_versions.get(vendor_name.lower(), 0)
     
     def update(self, invoice_id: str, **updates) -> Invoice:
-        """Update an invoice."""
-        invoice = self.get(invoice_id)
-        for key, value in updates.items():
-            setattr(invoice, key, value)
-        return invoice
+        """
+        Update an invoice.
+        
+        The lookup and write happen under one lock, so an invoice deleted by
+        another thread is reported as not found instead of being written back.
+        """
+        unknown_fields = updates.keys() - Invoice.model_fields.keys()
+        if unknown_fields:
+            raise ValueError(f"Unknown invoice fields: {', '.join(sorted(unknown_fields))}")
+        with self._lock:
+            invoice = self._invoices.get(invoice_id)
+            if invoice is None:
+                raise InvoiceNotFoundError(f"Invoice {invoice_id} not found")
+            # Apply all updates in one copy instead of per-field validated setattr
+            updated_invoice = invoice.model_copy(update=updates)
+            self._invoices[invoice_id] = updated_invoice
+            if 'parsed_data' in updates:
+                self._unindex(invoice)
+                self._index(updated_invoice)
+        return updated_invoice
+    
+    def clear(self) -> None:
+        """Remove all stored invoices."""
+        with self._lock:
+            self._invoices.clear()
+            self._by_vendor.clear()
+            self._vendor_versions.clear()
     
     def delete(self, invoice_id: str) -> bool:
         """Delete an invoice by ID."""
-        if invoice_id not in self._invoices:
+        if not self.delete_many([invoice_id]):
             raise InvoiceNotFoundError(f"Invoice {invoice_id} not found")
-        del self._invoices[invoice_id]
         return True
+    
+    def delete_many(self, invoice_ids: List[str]) -> List[str]:
+        """Delete several invoices, returning the IDs that existed and were deleted."""
+        deleted = []
+        with self._lock:
+            for invoice_id in invoice_ids:
+                invoice = self._invoices.pop(invoice_id, None)
+                if invoice is not None:
+                    self._unindex(invoice)
+                    deleted.append(invoice_id)
+        return deleted
@@ -1,10 +1,14 @@
 """API views/endpoints for ERPNext integration."""
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+import orjson
+from fastapi import APIRouter, HTTPException, Response, status
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List
 from app.models.anomaly import AnomalyResult
-from app.services.erpnext_client import ERPNextClient
+from app.services.erpnext_client import get_erpnext_client
 from app.services.anomaly_service import AnomalyService
+from app.services.storage_service import StorageService
 from app.config import Config
 from app.models.invoice import Invoice, ParsedInvoice
 from app.exceptions import ParsingError
@@ -24,17 +28,7 @@ class AnalyzeInvoiceResponse(BaseModel):
     vendor_name: str
 
 
-# Initialize ERPNext client (will be None if not configured)
-erpnext_client: ERPNextClient | None = None
-
-if Config.validate_erpnext_config():
-    erpnext_client = ERPNextClient(
-        base_url=Config.ERPNEXT_BASE_URL,
-        api_key=Config.ERPNEXT_API_KEY,
-        api_secret=Config.ERPNEXT_API_SECRET
-    )
-
-router = APIRouter(prefix="/api/erpnext", tags=["erpnext"])
+router = APIRouter(prefix="/api/erpnext", tags=["erpnext"], default_response_class=ORJSONResponse)
 
 
 @router.post("/analyze-invoice", response_model=AnalyzeInvoiceResponse)
@@ -54,6 +48,7 @@ async def analyze_invoice(request: AnalyzeInvoiceRequest):
     Returns:
         AnalyzeInvoiceResponse with risk_score (0-100), status, and reasons
     """
+    erpnext_client = get_erpnext_client()
     if not erpnext_client:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -62,10 +57,14 @@ async def analyze_invoice(request: AnalyzeInvoiceRequest):
     
     try:
         # Step 1: Fetch invoice from ERPNext
-        parsed_invoice = erpnext_client.fetch_and_parse_invoice(request.invoice_id)
+        # (blocking HTTP calls run in a worker thread to keep the event loop free)
+        parsed_invoice = await asyncio.to_thread(
+            erpnext_client.fetch_and_parse_invoice, request.invoice_id
+        )
         
         # Step 2: Fetch historical invoices from same supplier
-        historical_parsed = erpnext_client.fetch_historical_invoices(
+        historical_parsed = await asyncio.to_thread(
+            erpnext_client.fetch_historical_invoices,
             supplier=parsed_invoice.vendor_name,
             exclude_invoice_id=request.invoice_id
         )
@@ -90,12 +89,11 @@ async def analyze_invoice(request: AnalyzeInvoiceRequest):
         
         # Step 5: Perform anomaly analysis
         # Create a temporary storage service with historical invoices
-        from app.services.storage_service import StorageService
         temp_storage = StorageService()
         
         # Add historical invoices to storage
         for hist_inv in historical_invoices:
-            temp_storage._invoices[hist_inv.id] = hist_inv
+            temp_storage.save(hist_inv)
         
         # Create anomaly service with temporary storage
         anomaly_service = AnomalyService(temp_storage)
@@ -135,14 +133,18 @@ async def analyze_invoice(request: AnalyzeInvoiceRequest):
         )
 
 
+# Response for the common unconfigured case, encoded once
+NOT_CONFIGURED_HEALTH_BODY = orjson.dumps({
+    "configured": False,
+    "message": "ERPNext integration not configured"
+})
+
+
 @router.get("/health")
 async def erpnext_health():
     """Check ERPNext integration health."""
-    if not erpnext_client:
-        return {
-            "configured": False,
-            "message": "ERPNext integration not configured"
-        }
+    if not get_erpnext_client():
+        return Response(content=NOT_CONFIGURED_HEALTH_BODY, media_type="application/json")
     
     try:
         # Try to make a simple API call to verify connectivity
@@ -1,15 +1,23 @@
 """API views/endpoints for invoice operations."""
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Query
-from fastapi.responses import JSONResponse
-from typing import List
-from app.models.invoice import Invoice
+import asyncio
+import logging
+import os
+import time
+from fastapi import APIRouter, Body, UploadFile, File, HTTPException, status, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Iterable, Iterator, List, Optional
+from pydantic import BaseModel
+from app.models.invoice import Invoice, InvoiceCreate, BatchUploadResult, BatchUploadError, ERPNextSyncStatus
 from app.models.anomaly import AnomalyResult
 from app.controllers.invoice_controller import InvoiceController
 from app.controllers.anomaly_controller import AnomalyController
-from app.exceptions import InvoiceNotFoundError, ParsingError, InvalidInvoiceFormatError
+from app.exceptions import InvoiceNotFoundError, ParsingError
 from app.services.parser_service import ParserService
 from app.services.anomaly_service import AnomalyService
 from app.services.storage_service import StorageService
+from app.services.erpnext_client import ERPNextClient, get_erpnext_client
+from app.config import Config
+from app.workers import erpnext_sync_pool
 
 # Initialize services (dependency injection would be better, but keeping it simple)
 storage_service = StorageService()
@@ -18,7 +26,149 @@ anomaly_service = AnomalyService(storage_service)
 invoice_controller = InvoiceController(parser_service, storage_service)
 anomaly_controller = AnomalyController(anomaly_service, invoice_controller)
 
-router = APIRouter(prefix="/api/invoices", tags=["invoices"])
+router = APIRouter(prefix="/api/invoices", tags=["invoices"], default_response_class=ORJSONResponse)
+
+logger = logging.getLogger(__name__)
+
+# Upload content types the parser can handle (PDFs, images and text files from the UI)
+ALLOWED_UPLOAD_CONTENT_TYPES = frozenset({
+    "application/pdf",
+    "image/png",
+    "image/jpeg",
+    "text/plain",
+    "application/octet-stream",
+})
+
+# Caps how many uploads are parsed at once in worker threads
+parse_semaphore = asyncio.Semaphore(Config.MAX_CONCURRENT_PARSES)
+
+
+class _SampledErrorLog:
+    """
+    Log full tracebacks at most once per interval.
+    
+    Errors in between are logged as a single line, so a failing dependency
+    (e.g. ERPNext during an outage) does not flood the logs with tracebacks.
+    """
+    
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._last_traceback = float("-inf")
+        self._suppressed = 0
+    
+    def exception(self, message: str, *args) -> None:
+        """Log the current exception, including the traceback if the interval has passed."""
+        now = time.monotonic()
+        if now - self._last_traceback >= self.interval:
+            logger.exception(message, *args)
+            self._last_traceback = now
+            self._suppressed = 0
+        else:
+            self._suppressed += 1
+            logger.error(message + " (traceback suppressed, %d since last)", *args, self._suppressed)
+
+
+_erpnext_sync_errors = _SampledErrorLog()
+_upload_errors = _SampledErrorLog()
+
+
+async def _check_upload(file: UploadFile) -> None:
+    """Reject an uploaded file with a bad content type or size, without reading it."""
+    # Parts sent without a content type are left for the parser to judge
+    if file.content_type and file.content_type not in ALLOWED_UPLOAD_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported file type: {file.content_type}"
+        )
+    size = file.size
+    if size is None:
+        # Size unknown (e.g. UploadFile built by hand) - measure the spooled file
+        await file.seek(0, os.SEEK_END)
+        size = file.file.tell()
+    await file.seek(0)
+    if size > Config.MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds maximum upload size of {Config.MAX_UPLOAD_BYTES} bytes"
+        )
+
+
+def _model_response(model: BaseModel, status_code: int = status.HTTP_200_OK) -> Response:
+    """
+    Serialize an already-validated model straight to JSON bytes.
+    
+    Returning a Response skips FastAPI's response_model re-validation, and
+    pydantic-core's JSON serializer avoids building an intermediate dict. The
+    route's response_model is still used for the OpenAPI schema.
+    """
+    return Response(
+        content=model.model_dump_json(),
+        status_code=status_code,
+        media_type="application/json"
+    )
+
+
+async def _parse_upload(file: UploadFile, save: bool = True) -> Invoice:
+    """
+    Parse an uploaded file in a worker thread, bounded by parse_semaphore.
+    
+    With save=False the invoice is returned unsaved, for callers that save
+    several invoices in a fixed order.
+    """
+    await _check_upload(file)
+    parse = invoice_controller.upload_and_parse_invoice if save else invoice_controller.parse_invoice_file
+    # Parsing is blocking PDF work - run it off the event loop. The parser reads
+    # the spooled upload file in place instead of a copy of its bytes.
+    async with parse_semaphore:
+        return await asyncio.to_thread(parse, file.file, file.filename or "unknown")
+
+
+def _set_sync_status(invoice_id: str, sync_status: ERPNextSyncStatus) -> Optional[Invoice]:
+    """Record an invoice's ERPNext sync status, returning the updated invoice."""
+    try:
+        # update() leaves the vendor index alone, keeping cached analyses valid
+        return storage_service.update(invoice_id, erpnext_sync_status=sync_status)
+    except InvoiceNotFoundError:
+        # Deleted while its sync was queued or running
+        return None
+
+
+def _sync_to_erpnext(
+    erpnext_client: ERPNextClient, invoice: Invoice,
+    risk_score: Optional[int], risk_explanation: Optional[str]
+) -> None:
+    """
+    Create the invoice in ERPNext on a sync pool thread.
+    
+    Failures are logged (not raised) and recorded on the stored invoice, so
+    clients can poll GET /{invoice_id} for the outcome.
+    """
+    try:
+        logger.info("Creating Purchase Invoice in ERPNext...")
+        # Pass risk score to include it in ERPNext
+        erpnext_result = erpnext_client.create_purchase_invoice(
+            invoice.parsed_data,
+            risk_score=risk_score,
+            risk_explanation=risk_explanation
+        )
+        erpnext_invoice_name = erpnext_result.get('data', {}).get('name', 'unknown')
+        logger.info("✓ Invoice created in ERPNext: %s", erpnext_invoice_name)
+        if risk_score is not None:
+            logger.info("✓ Risk score (%s/100) added to ERPNext invoice", risk_score)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("  Risk explanation: %s...", risk_explanation[:100] if risk_explanation else 'N/A')
+        else:
+            logger.warning("⚠ Risk score not available - invoice was not analyzed before sync")
+        logger.info("✓ Invoice submitted successfully in ERPNext")
+        logger.info("📋 View invoice in ERPNext: %s/app/purchase-invoice/%s", Config.ERPNEXT_BASE_URL, erpnext_invoice_name)
+        _set_sync_status(invoice.id, ERPNextSyncStatus.OK)
+    except Exception as e:
+        # The message carries ERPNext's error details; the traceback is sampled
+        _erpnext_sync_errors.exception(
+            "✗ Failed to sync invoice to ERPNext (%s): %s", type(e).__name__, e
+        )
+        # The upload has already been returned, so a failed sync is only recorded
+        _set_sync_status(invoice.id, ERPNextSyncStatus.FAILED)
 
 
 @router.post("/upload", response_model=Invoice, status_code=status.HTTP_201_CREATED)
@@ -36,95 +186,121 @@ async def upload_invoice(
     Returns:
         The parsed invoice with ID.
     """
-    import logging
-    from app.services.erpnext_client import ERPNextClient
-    from app.config import Config
-    
-    logger = logging.getLogger(__name__)
-    
     try:
-        logger.info(f"Received upload request for file: {file.filename}, sync_to_erpnext: {sync_to_erpnext}")
-        file_content = await file.read()
-        logger.info(f"File read successfully, size: {len(file_content)} bytes")
-        
-        invoice = invoice_controller.upload_and_parse_invoice(
-            file_content, file.filename or "unknown"
-        )
-        logger.info(f"Invoice parsed successfully, ID: {invoice.id}")
+        logger.info("Received upload request for file: %s, sync_to_erpnext: %s", file.filename, sync_to_erpnext)
+        invoice = await _parse_upload(file)
+        logger.info("Invoice parsed successfully, ID: %s", invoice.id)
         
         # Analyze invoice first to get risk score (before syncing to ERPNext)
         risk_score = None
         risk_explanation = None
         try:
-            updated_invoice, analysis_result = anomaly_controller.analyze_invoice(invoice.id)
+            updated_invoice, analysis_result = await asyncio.to_thread(
+                anomaly_controller.analyze_invoice, invoice.id
+            )
             risk_score = analysis_result.risk_score
             risk_explanation = analysis_result.explanation
-            logger.info(f"Invoice analyzed - Risk Score: {risk_score}/100")
+            logger.info("Invoice analyzed - Risk Score: %s/100", risk_score)
             # Update invoice with analysis results
             invoice = updated_invoice
         except Exception as e:
-            logger.warning(f"Could not analyze invoice before ERPNext sync: {str(e)}")
+            logger.warning("Could not analyze invoice before ERPNext sync: %s", e)
         
         # Optionally sync to ERPNext
         if sync_to_erpnext:
             logger.info("ERPNext sync requested")
-            if Config.validate_erpnext_config():
-                logger.info(f"ERPNext configured: {Config.ERPNEXT_BASE_URL}")
-                try:
-                    erpnext_client = ERPNextClient(
-                        base_url=Config.ERPNEXT_BASE_URL,
-                        api_key=Config.ERPNEXT_API_KEY,
-                        api_secret=Config.ERPNEXT_API_SECRET
-                    )
-                    logger.info("Creating Purchase Invoice in ERPNext...")
-                    # Set a shorter timeout to prevent hanging
-                    # Pass risk score to include it in ERPNext
-                    erpnext_result = erpnext_client.create_purchase_invoice(
-                        invoice.parsed_data,
-                        risk_score=risk_score,
-                        risk_explanation=risk_explanation
-                    )
-                    erpnext_invoice_name = erpnext_result.get('data', {}).get('name', 'unknown')
-                    logger.info(f"✓ Invoice created in ERPNext: {erpnext_invoice_name}")
-                    if risk_score is not None:
-                        logger.info(f"✓ Risk score ({risk_score}/100) added to ERPNext invoice")
-                        logger.info(f"  Risk explanation: {risk_explanation[:100] if risk_explanation else 'N/A'}...")
-                    else:
-                        logger.warning("⚠ Risk score not available - invoice was not analyzed before sync")
-                    logger.info(f"✓ Invoice submitted successfully in ERPNext")
-                    logger.info(f"📋 View invoice in ERPNext: {Config.ERPNEXT_BASE_URL}/app/purchase-invoice/{erpnext_invoice_name}")
-                except Exception as e:
-                    logger.error(f"✗ Failed to sync invoice to ERPNext: {str(e)}")
-                    logger.error(f"Error type: {type(e).__name__}")
-                    # Log the full error message which should contain ERPNext's error details
-                    if hasattr(e, 'args') and e.args:
-                        logger.error(f"Error details: {e.args}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    # Don't fail the upload if ERPNext sync fails - continue and return invoice
+            erpnext_client = get_erpnext_client()
+            if erpnext_client:
+                logger.info("ERPNext configured: %s", Config.ERPNEXT_BASE_URL)
+                # Queue the sync so the upload responds without waiting on ERPNext;
+                # the returned invoice reports it as pending until a worker finishes
+                invoice = _set_sync_status(invoice.id, ERPNextSyncStatus.PENDING) or invoice
+                erpnext_sync_pool.submit(
+                    _sync_to_erpnext, erpnext_client, invoice, risk_score, risk_explanation
+                )
             else:
                 logger.warning("✗ ERPNext sync requested but ERPNext not configured")
-                logger.warning(f"ERPNEXT_BASE_URL: {Config.ERPNEXT_BASE_URL}")
-                logger.warning(f"ERPNEXT_API_KEY set: {bool(Config.ERPNEXT_API_KEY)}")
-                logger.warning(f"ERPNEXT_API_SECRET set: {bool(Config.ERPNEXT_API_SECRET)}")
+                logger.warning("ERPNEXT_BASE_URL: %s", Config.ERPNEXT_BASE_URL)
+                logger.warning("ERPNEXT_API_KEY set: %s", bool(Config.ERPNEXT_API_KEY))
+                logger.warning("ERPNEXT_API_SECRET set: %s", bool(Config.ERPNEXT_API_SECRET))
         
-        return invoice
+        return _model_response(invoice, status.HTTP_201_CREATED)
+    except HTTPException:
+        raise
     except ParsingError as e:
-        logger.error(f"Parsing error: {str(e)}")
+        logger.error("Parsing error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        _upload_errors.exception("Unexpected error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process invoice: {str(e)}"
         )
 
 
+@router.post("/upload-batch", response_model=BatchUploadResult, status_code=status.HTTP_201_CREATED)
+async def upload_invoices_batch(files: List[UploadFile] = File(...)):
+    """
+    Upload and parse several invoice files concurrently.
+    
+    Files are parsed in parallel (bounded by MAX_CONCURRENT_PARSES), then
+    saved and analyzed one by one in upload order, so each invoice is scored
+    against the same history as if it had been uploaded on its own. Files
+    that fail are reported in `errors` instead of failing the whole batch.
+    At most MAX_BATCH_UPLOAD_FILES files are accepted per request.
+    """
+    if len(files) > Config.MAX_BATCH_UPLOAD_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files: at most {Config.MAX_BATCH_UPLOAD_FILES} per batch"
+        )
+    results = await asyncio.gather(
+        *(_parse_upload(file, save=False) for file in files),
+        return_exceptions=True
+    )
+    
+    parsed: List[Invoice] = []
+    errors: List[BatchUploadError] = []
+    for file, result in zip(files, results):
+        filename = file.filename or "unknown"
+        if isinstance(result, HTTPException):
+            errors.append(BatchUploadError(filename=filename, detail=str(result.detail)))
+        elif isinstance(result, Exception):
+            errors.append(BatchUploadError(filename=filename, detail=str(result)))
+        else:
+            parsed.append(result)
+    
+    # Save and score the whole batch in one worker thread instead of on the event loop
+    invoices = await asyncio.to_thread(_save_and_analyze_batch, parsed)
+    return _model_response(
+        BatchUploadResult(invoices=invoices, errors=errors), status.HTTP_201_CREATED
+    )
+
+
+def _save_and_analyze_batch(invoices: List[Invoice]) -> List[Invoice]:
+    """
+    Save and analyze a batch of parsed invoices in upload order.
+    
+    Each invoice is analyzed before the next is saved, so later files in the
+    batch never count as history for earlier ones.
+    """
+    analyzed = []
+    for invoice in invoices:
+        invoice_controller.save_invoice(invoice)
+        try:
+            invoice, _ = anomaly_controller.analyze_invoice(invoice.id)
+        except Exception:
+            # Analysis is best-effort, as in the single upload endpoint
+            pass
+        analyzed.append(invoice)
+    return analyzed
+
+
 @router.post("/create", response_model=Invoice, status_code=status.HTTP_201_CREATED)
-async def create_invoice(invoice_data: dict):
+async def create_invoice(invoice_data: InvoiceCreate):
     """
     Create an invoice from JSON data (useful for testing).
     
@@ -144,15 +320,14 @@ async def create_invoice(invoice_data: dict):
         ],
         "currency": "USD"
     }
+    
+    `invoice_date` accepts any ISO 8601 date or datetime string. Invalid
+    data is rejected by FastAPI with a 422 validation error response (this
+    endpoint returned 400 before the body was typed).
     """
     try:
         invoice = invoice_controller.create_invoice_from_data(invoice_data)
-        return invoice
-    except InvalidInvoiceFormatError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
+        return _model_response(invoice, status.HTTP_201_CREATED)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -160,11 +335,26 @@ async def create_invoice(invoice_data: dict):
         )
 
 
+@router.post("/bulk-delete", status_code=status.HTTP_200_OK)
+async def bulk_delete_invoices(invoice_ids: List[str] = Body(..., description="IDs of the invoices to delete")):
+    """
+    Delete several invoices in one request.
+    
+    Returns how many invoices were deleted and which IDs were not found.
+    """
+    deleted_ids = invoice_controller.delete_invoices(invoice_ids)
+    deleted = set(deleted_ids)
+    return {
+        "deleted": len(deleted_ids),
+        "not_found": [invoice_id for invoice_id in invoice_ids if invoice_id not in deleted]
+    }
+
+
 @router.get("/{invoice_id}", response_model=Invoice)
 async def get_invoice(invoice_id: str):
     """Get invoice details by ID."""
     try:
-        return invoice_controller.get_invoice(invoice_id)
+        return _model_response(invoice_controller.get_invoice(invoice_id))
     except InvoiceNotFoundError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -172,22 +362,50 @@ async def get_invoice(invoice_id: str):
         )
 
 
+def _stream_json_array(invoices: Iterable[Invoice]) -> Iterator[bytes]:
+    """Encode invoices as a JSON array one invoice at a time."""
+    separator = b"["
+    for invoice in invoices:
+        yield separator + invoice.model_dump_json().encode()
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
 @router.get("", response_model=List[Invoice])
-async def list_invoices():
-    """List all invoices."""
-    return invoice_controller.list_invoices()
+async def list_invoices(
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of invoices to return"),
+    offset: int = Query(0, ge=0, description="Number of invoices to skip")
+):
+    """
+    List invoices.
+    
+    Returns all invoices unless limit/offset are given. The total number of
+    invoices is returned in the X-Total-Count header. The body is streamed,
+    encoding one invoice at a time instead of serializing the whole list first.
+    """
+    return StreamingResponse(
+        _stream_json_array(invoice_controller.list_invoices(limit=limit, offset=offset)),
+        media_type="application/json",
+        headers={"X-Total-Count": str(invoice_controller.count_invoices())}
+    )
 
 
 @router.post("/{invoice_id}/analyze", response_model=AnomalyResult)
-async def analyze_invoice(invoice_id: str):
+async def analyze_invoice(
+    invoice_id: str,
+    force: bool = Query(False, description="If True, re-run the analysis instead of reusing the last result")
+):
     """
     Analyze an invoice for anomalies and potential fraud.
     
+    The analysis done at upload is reused until the vendor's invoices change.
     Returns risk score (0-100) and human-readable explanation.
     """
     try:
-        invoice, anomaly_result = anomaly_controller.analyze_invoice(invoice_id)
-        return anomaly_result
+        invoice, anomaly_result = await asyncio.to_thread(
+            anomaly_controller.analyze_invoice, invoice_id, force
+        )
+        return _model_response(anomaly_result)
     except InvoiceNotFoundError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -209,7 +427,8 @@ async def delete_invoice(invoice_id: str):
     """
     try:
         invoice_controller.delete_invoice(invoice_id)
-        return {"message": f"Invoice {invoice_id} deleted successfully", "deleted": True}
+        # Plain dict of JSON-native values - skip FastAPI's jsonable_encoder pass
+        return ORJSONResponse({"message": f"Invoice {invoice_id} deleted successfully", "deleted": True})
     except InvoiceNotFoundError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
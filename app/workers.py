@@ -0,0 +1,46 @@
+"""Background worker pools for work that should not hold up a request."""
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Optional
+from app.config import Config
+
+
+class WorkerPool:
+    """
+    A lazily started thread pool for fire-and-forget jobs.
+    
+    Jobs run outside the event loop, so a slow dependency only occupies a
+    pool thread and never the request that queued the job. The pool is
+    started on first use and can be started again after shutdown.
+    """
+    
+    def __init__(self, max_workers: int, name: str):
+        """
+        Args:
+            max_workers: Maximum number of jobs running at once
+            name: Thread name prefix for the pool's workers
+        """
+        self.max_workers = max_workers
+        self.name = name
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = Lock()
+    
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Queue a job and return immediately."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+            return self._executor.submit(fn, *args, **kwargs)
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the pool, by default after finishing the queued jobs."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+# ERPNext round trips run here so uploads respond without waiting on ERPNext
+erpnext_sync_pool = WorkerPool(Config.ERPNEXT_SYNC_WORKERS, "erpnext-sync")
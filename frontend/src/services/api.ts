@@ -32,6 +32,7 @@ export interface Invoice {
   is_suspicious?: boolean
   risk_score?: number
   anomaly_explanation?: string
+  erpnext_sync_status?: 'pending' | 'ok' | 'failed' | null
 }
 
 export interface AnomalyDetail {
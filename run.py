@@ -1,10 +1,23 @@
 """Simple script to run the FastAPI application."""
+import os
+import sys
 import uvicorn
 
 if __name__ == "__main__":
+    # Invoices are stored in memory per process, so multiple workers only
+    # make sense behind persistent storage. Set WEB_CONCURRENCY to opt in.
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        # Auto-reload is a development feature and cannot be combined with workers
+        reload=workers == 1,
+        workers=workers,
+        # uvicorn[standard] installs uvloop (except on Windows) and httptools.
+        # Naming them makes a broken install fail at startup instead of quietly
+        # falling back to the slower asyncio loop and h11 parser.
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
     )
@@ -14,12 +14,12 @@ class TestErrorHandling:
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "detail" in response.json()
     
-    def test_400_error_format(self, client):
-        """Test that 400 errors return proper format."""
+    def test_422_error_format(self, client):
+        """Test that validation errors return proper format."""
         invalid_data = {"invalid": "data"}
         response = client.post("/api/invoices/create", json=invalid_data)
         
-        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
         assert "detail" in response.json()
     
     def test_health_endpoint(self, client):
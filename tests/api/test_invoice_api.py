@@ -28,7 +28,15 @@ class TestInvoiceUpload:
         }
         
         response = client.post("/api/invoices/create", json=invalid_data)
-        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    def test_create_invoice_date_only(self, client, mock_invoice_data):
+        """Test a plain ISO date is accepted for invoice_date."""
+        mock_invoice_data["invoice_date"] = "2024-01-15"
+        response = client.post("/api/invoices/create", json=mock_invoice_data)
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["parsed_data"]["invoice_date"] == "2024-01-15T00:00:00"
     
     @patch('app.views.invoice_views.parser_service')
     def test_upload_invoice_file_parsing_error(self, mock_parser, client):
@@ -43,6 +51,133 @@ class TestInvoiceUpload:
         
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert "Parsing failed" in response.json()["detail"]
+    
+    @patch('app.config.Config.MAX_UPLOAD_BYTES', 1024)
+    def test_upload_invoice_too_large(self, client):
+        """Test upload is rejected once the file exceeds the size limit."""
+        files = {"file": ("big.pdf", b"x" * 2048, "application/pdf")}
+        response = client.post("/api/invoices/upload", files=files)
+        
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    
+    @patch('app.config.Config.MAX_UPLOAD_BYTES', 1024)
+    def test_upload_invoice_request_too_large(self, client):
+        """Test upload is rejected from Content-Length before the body is parsed."""
+        files = {"file": ("big.pdf", b"x" * (256 * 1024), "application/pdf")}
+        response = client.post("/api/invoices/upload", files=files)
+        
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert "Request body exceeds" in response.json()["detail"]
+    
+    @patch('app.config.Config.MAX_UPLOAD_BYTES', 1024)
+    @patch('app.config.Config.MAX_BATCH_UPLOAD_FILES', 2)
+    def test_upload_invoice_batch_request_too_large(self, client):
+        """Test batch upload is size-limited and its 413 still carries CORS headers."""
+        files = [
+            ("files", (f"big{i}.pdf", b"x" * (64 * 1024), "application/pdf"))
+            for i in range(3)
+        ]
+        response = client.post(
+            "/api/invoices/upload-batch", files=files,
+            headers={"Origin": "http://localhost:3000"}
+        )
+        
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+    
+    @patch('app.config.Config.MAX_BATCH_UPLOAD_FILES', 2)
+    def test_upload_invoice_batch_too_many_files(self, client):
+        """Test batch upload rejects more files than the per-batch maximum."""
+        files = [
+            ("files", (f"file{i}.pdf", b"fake content", "application/pdf"))
+            for i in range(3)
+        ]
+        response = client.post("/api/invoices/upload-batch", files=files)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_upload_invoice_unsupported_type(self, client):
+        """Test upload is rejected for content types the parser cannot handle."""
+        files = {"file": ("archive.zip", b"PK fake zip", "application/zip")}
+        response = client.post("/api/invoices/upload", files=files)
+        
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    
+    def test_upload_invoice_batch_scores_in_upload_order(self, client):
+        """Test a batch invoice is not scored against files uploaded after it."""
+        from app.views import invoice_views
+        
+        files = {"file": ("first.pdf", b"fake content", "application/pdf")}
+        single = client.post("/api/invoices/upload", files=files).json()
+        invoice_views.storage_service.clear()
+        
+        files = [
+            ("files", ("first.pdf", b"fake content", "application/pdf")),
+            ("files", ("second.pdf", b"more fake content", "application/pdf")),
+        ]
+        first = client.post("/api/invoices/upload-batch", files=files).json()["invoices"][0]
+        
+        assert first["risk_score"] == single["risk_score"]
+        assert first["anomaly_explanation"] == single["anomaly_explanation"]
+    
+    @patch('app.views.invoice_views.get_erpnext_client')
+    def test_upload_invoice_sync_to_erpnext(self, mock_get_client, client):
+        """Test ERPNext sync is queued and its outcome recorded on the invoice."""
+        from app.workers import erpnext_sync_pool
+        
+        mock_get_client.return_value.create_purchase_invoice.return_value = {"data": {"name": "PI-0001"}}
+        
+        files = {"file": ("test.pdf", b"fake content", "application/pdf")}
+        response = client.post("/api/invoices/upload?sync_to_erpnext=true", files=files)
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["erpnext_sync_status"] == "pending"
+        
+        # Wait for the queued sync to finish
+        erpnext_sync_pool.shutdown(wait=True)
+        
+        invoice_id = response.json()["id"]
+        response = client.get(f"/api/invoices/{invoice_id}")
+        assert response.json()["erpnext_sync_status"] == "ok"
+        mock_get_client.return_value.create_purchase_invoice.assert_called_once()
+    
+    @patch('app.views.invoice_views.get_erpnext_client')
+    def test_upload_invoice_sync_after_delete(self, mock_get_client, client):
+        """Test a sync finishing after its invoice was deleted does not restore it."""
+        from app.views import invoice_views
+        from app.workers import erpnext_sync_pool
+        
+        def delete_during_sync(parsed_data, **kwargs):
+            invoice_views.storage_service.delete(invoice_id)
+            return {"data": {"name": "PI-0001"}}
+        
+        mock_get_client.return_value.create_purchase_invoice.side_effect = delete_during_sync
+        
+        # Hold the pool until the invoice ID is known to the mock
+        with patch.object(erpnext_sync_pool, "submit") as mock_submit:
+            files = {"file": ("test.pdf", b"fake content", "application/pdf")}
+            response = client.post("/api/invoices/upload?sync_to_erpnext=true", files=files)
+        invoice_id = response.json()["id"]
+        mock_submit.call_args.args[0](*mock_submit.call_args.args[1:])
+        
+        assert client.get(f"/api/invoices/{invoice_id}").status_code == status.HTTP_404_NOT_FOUND
+        assert invoice_views.storage_service.count() == 0
+    
+    @patch('app.config.Config.MAX_UPLOAD_BYTES', 1024)
+    def test_upload_invoice_batch(self, client):
+        """Test batch upload parses each file and reports failures per file."""
+        files = [
+            ("files", ("first.pdf", b"fake content", "application/pdf")),
+            ("files", ("second.pdf", b"more fake content", "application/pdf")),
+            ("files", ("big.pdf", b"x" * 2048, "application/pdf")),
+        ]
+        response = client.post("/api/invoices/upload-batch", files=files)
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert len(data["invoices"]) == 2
+        assert len({invoice["id"] for invoice in data["invoices"]}) == 2
+        assert [error["filename"] for error in data["errors"]] == ["big.pdf"]
 
 
 class TestInvoiceRetrieval:
@@ -84,6 +219,19 @@ class TestInvoiceRetrieval:
         assert response.status_code == status.HTTP_200_OK
         invoices = response.json()
         assert len(invoices) >= 2
+    
+    def test_list_invoices_paginated(self, client, mock_invoice_data):
+        """Test listing invoices with limit/offset."""
+        for number in ("INV-P01", "INV-P02", "INV-P03"):
+            invoice_data = mock_invoice_data.copy()
+            invoice_data["invoice_number"] = number
+            client.post("/api/invoices/create", json=invoice_data)
+        
+        response = client.get("/api/invoices", params={"limit": 2, "offset": 1})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == 2
+        assert int(response.headers["X-Total-Count"]) >= 3
 
 
 class TestAnomalyAnalysis:
@@ -106,6 +254,23 @@ class TestAnomalyAnalysis:
         # First invoice should have low risk
         assert data["risk_score"] < 50
     
+    def test_analyze_invoice_reuses_result_unless_forced(self, client, mock_invoice_data):
+        """Test repeated analysis reuses the last result unless force is set."""
+        from app.views import invoice_views
+        
+        create_response = client.post("/api/invoices/create", json=mock_invoice_data)
+        invoice_id = create_response.json()["id"]
+        first = client.post(f"/api/invoices/{invoice_id}/analyze").json()
+        
+        service = invoice_views.anomaly_service
+        with patch.object(service, "_analyze", wraps=service._analyze) as mock_analyze:
+            assert client.post(f"/api/invoices/{invoice_id}/analyze").json() == first
+            mock_analyze.assert_not_called()
+            
+            response = client.post(f"/api/invoices/{invoice_id}/analyze?force=true")
+            assert response.json() == first
+            mock_analyze.assert_called_once()
+    
     def test_analyze_invoice_with_price_increase(self, client):
         """Test detection of price increase anomaly."""
         # Create historical invoice
@@ -222,6 +387,25 @@ class TestInvoiceDeletion:
         response = client.delete("/api/invoices/non-existent-id")
         
         assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_bulk_delete_invoices(self, client, mock_invoice_data):
+        """Test deleting several invoices in one request."""
+        invoice_ids = [
+            client.post("/api/invoices/create", json=mock_invoice_data).json()["id"]
+            for _ in range(2)
+        ]
+        
+        response = client.post(
+            "/api/invoices/bulk-delete",
+            json=invoice_ids + ["non-existent-id"]
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["deleted"] == 2
+        assert data["not_found"] == ["non-existent-id"]
+        for invoice_id in invoice_ids:
+            assert client.get(f"/api/invoices/{invoice_id}").status_code == status.HTTP_404_NOT_FOUND
 
 
 class TestHealthCheck:
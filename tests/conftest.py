@@ -2,6 +2,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.views import invoice_views
 from app.services.storage_service import StorageService
 from app.services.parser_service import ParserService
 from app.services.anomaly_service import AnomalyService
@@ -9,6 +10,14 @@ from app.controllers.invoice_controller import InvoiceController
 from app.controllers.anomaly_controller import AnomalyController
 
 
+@pytest.fixture(autouse=True)
+def reset_app_storage():
+    """Start every test with the app's shared in-memory storage empty."""
+    invoice_views.storage_service.clear()
+    yield
+    invoice_views.storage_service.clear()
+
+
 @pytest.fixture
 def client():
     """Create a test client."""